@@ -1,186 +1,1377 @@
-from typing import Tuple, Union
+import threading
+import time
+from collections import OrderedDict
+from enum import IntEnum
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, NamedTuple, Tuple, Union
 
 BECH32M = 0x2BC830A3
+# Constant of the original BIP-173 bech32 checksum
+BECH32 = 1
 
 BECH32M_CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
 BECH32M_MAX_LENGTH = 90
+# Limit of the long mode, like the variants used for invoices and descriptors
+BECH32M_LONG_MAX_LENGTH = 1023
 BECH32M_CHECKSUM_LENGTH = 6
 
+# Number of human-readable parts whose checksum state is kept around
+HRP_CACHE_SIZE = 64
 
-def polymod(values: bytes) -> int:
+# Valid strings whose data `decode_many` converts together
+DECODE_ROWS = 256
+
+# Default number of outcomes kept by a DecodeCache
+DECODE_CACHE_SIZE = 4096
+
+# Single-symbol errors have distinct checksum residues up to this many symbols
+SYNDROME_MAX_POSITIONS = 1023
+
+# Wrong characters the checksum is guaranteed to detect within the length limit,
+# correcting an error uses up two of them and an erasure one
+BECH32M_DETECTED_ERRORS = 4
+
+# Two symbols for every 10-bit value, for splitting 5-byte blocks
+_SYMBOL_PAIRS = [bytes([value >> 5, value & 31]) for value in range(1024)]
+
+# Bits of every symbol value, joined to read 8-symbol blocks as one integer
+_SYMBOL_BITS = [format(value, "05b") for value in range(32)]
+
+# bytes.translate tables between symbol values and the ASCII charset,
+# characters out of the charset are deleted during the translation
+_FROM_CHARSET = bytes.maketrans(BECH32M_CHARSET.encode(), bytes(range(32)))
+_NOT_CHARSET = bytes(set(range(256)) - set(BECH32M_CHARSET.encode()))
+_TO_CHARSET = bytes.maketrans(bytes(range(32)), BECH32M_CHARSET.encode())
+
+
+class Status(IntEnum):
+    """Reason why a string or its parts are not valid bech32m"""
+
+    OK = 0
+    MISSING_SEPARATOR = 1
+    TOO_LONG = 2
+    MIXED_CASE = 3
+    INVALID_CHARACTER = 4
+    CHECKSUM_TOO_SHORT = 5
+    HRP_LENGTH = 6
+    HRP_CHARACTER = 7
+    INVALID_CHECKSUM = 8
+
+
+class Encoding(IntEnum):
+    """Checksum variant of a string, BIP-173 bech32 or BIP-350 bech32m"""
+
+    BECH32 = 1
+    BECH32M = 2
+
+    @property
+    def constant(self) -> int:
+        """What the polymod of a string with a valid checksum is"""
+        return BECH32M if self == Encoding.BECH32M else BECH32
+
+
+# Variant of a string by its polymod, a single lookup classifies a string
+_ENCODINGS = {BECH32: Encoding.BECH32, BECH32M: Encoding.BECH32M}
+_ALL_ENCODINGS = (Encoding.BECH32M, Encoding.BECH32)
+
+
+_MESSAGES = {
+    Status.MISSING_SEPARATOR: "Missing separator '1'",
+    Status.TOO_LONG: "Bech32 string is too long ({}), maximum length is {}",
+    Status.MIXED_CASE: "String has mixed upper and lower case, maybe a typo?",
+    Status.INVALID_CHARACTER: "Data part contains a character not in the charset",
+    Status.CHECKSUM_TOO_SHORT: "Checksum is too short",
+    Status.HRP_LENGTH: "Human-readable part length has to be in range [1-83], but is {}",
+    Status.HRP_CHARACTER: (
+        "Human-readable part character out of range, acceptable range is [33-126]"
+    ),
+}
+
+
+class Bech32mError(ValueError):
+    """Invalid bech32m input, the reason is kept in `status`
+
+    The message is only formatted when the exception is printed, so rejecting
+    input costs no string building. `details` are the numbers for the message,
+    for invalid checksums `suggestions` holds the found corrections and
+    `details` how many errors were looked for.
+    """
+
+    def __init__(
+        self,
+        status: Status,
+        details: Tuple[int, ...] = (),
+        suggestions: Iterable[str] = (),
+    ) -> None:
+        super().__init__(status, details)
+        self.status = status
+        self.details = details
+        self.suggestions = list(suggestions)
+
+    def __reduce__(self):
+        return (Bech32mError, (self.status, self.details, self.suggestions))
+
+    def __str__(self) -> str:
+        if self.status != Status.INVALID_CHECKSUM:
+            return _MESSAGES[self.status].format(*self.details)
+
+        if len(self.suggestions) == 1:
+            return (
+                "The string is not valid, did you mean to use "
+                f"'{self.suggestions[0]}' instead?"
+            )
+        if self.suggestions:
+            options = ", ".join(f"'{fix}'" for fix in self.suggestions)
+            return f"The string is not valid, did you mean one of {options}?"
+        if not self.details:
+            return "The string is not valid."
+        count = (
+            "one incorrect character"
+            if self.details[0] == 1
+            else f"{self.details[0]} incorrect characters"
+        )
+        return f"The string is not valid and it contains more than {count}."
+
+
+POLYMOD_GEN = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+
+
+def polymod_reference(values: bytes) -> int:
     """Code taken from the bip-0350 bech32m specification"""
-    GEN = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
     chk = 1
     for v in values:
         b = chk >> 25
         chk = (chk & 0x1FFFFFF) << 5 ^ v
         for i in range(5):
-            chk ^= GEN[i] if ((b >> i) & 1) else 0
+            chk ^= POLYMOD_GEN[i] if ((b >> i) & 1) else 0
     return chk
 
 
+def _build_polymod_table(symbols: int) -> list[int]:
+    """Precompute what the top `symbols` 5-bit groups of the state add to the
+    state once they are shifted out by `symbols` polymod steps
+
+    The step is linear, so only the single-bit entries are computed with the
+    reference code and the rest are combined from them.
+    """
+    shift = 30 - 5 * symbols
+    table = [0] * (1 << 5 * symbols)
+    for bit in range(5 * symbols):
+        chk = 1 << (bit + shift)
+        for _ in range(symbols):
+            b = chk >> 25
+            chk = (chk & 0x1FFFFFF) << 5
+            for i in range(5):
+                chk ^= POLYMOD_GEN[i] if ((b >> i) & 1) else 0
+        table[1 << bit] = chk
+
+    for idx in range(1, len(table)):
+        low = idx & -idx
+        if low != idx:
+            table[idx] = table[idx ^ low] ^ table[low]
+
+    return table
+
+
+# Tables for one and three symbols per lookup, built once at import
+POLYMOD_TABLE_5 = _build_polymod_table(1)
+POLYMOD_TABLE_15 = _build_polymod_table(3)
+
+
+def polymod(values: bytes, chk: int = 1) -> int:
+    """Table-driven polymod, gives the same results as `polymod_reference`
+
+    Three symbols are processed per table lookup, the leftover ones one by one.
+    `chk` allows to continue from a state returned by an earlier call.
+    """
+    table_5 = POLYMOD_TABLE_5
+    table_15 = POLYMOD_TABLE_15
+
+    it = iter(values)
+    for a, b, c in zip(it, it, it):
+        chk = ((chk & 0x7FFF) << 15) ^ (a << 10 | b << 5 | c) ^ table_15[chk >> 15]
+
+    for v in values[len(values) - len(values) % 3 :]:
+        chk = ((chk & 0x1FFFFFF) << 5) ^ v ^ table_5[chk >> 25]
+
+    return chk
+
+
+# Bit i of a symbol as ASCII "0" or "1", to read a column of symbols as the
+# bits of one integer
+_SLICE_TABLES = [
+    bytes(b"01"[value >> bit & 1] for value in range(32)) + bytes(224)
+    for bit in range(5)
+]
+
+# Generator values XOR-ed into state bit i, by the top state bit selecting them
+_GEN_TAPS = [
+    tuple(j for j in range(5) if POLYMOD_GEN[j] >> bit & 1) for bit in range(30)
+]
+
+# Engines for the checksum of the batch functions
+ENGINES = ("table", "sliced")
+
+
+def polymod_sliced(rows: Iterable[bytes], chk: int = 1) -> list[int]:
+    """Bit-sliced polymod of equal-length rows of symbols, all from state `chk`
+
+    Returns the 30 bits of the states, the integer for bit i has bit i of the
+    state of the first row as its top bit down to the last row in bit 0. Every
+    polymod step is then a few dozen XORs of these integers for the whole batch.
+    """
+    rows = list(rows)
+    length = len(rows[0]) if rows else 0
+    if any(len(row) != length for row in rows):
+        raise ValueError("Rows of symbols are not of equal length")
+
+    ones = (1 << len(rows)) - 1
+    state = [ones if chk >> bit & 1 else 0 for bit in range(30)]
+    block = b"".join(rows)
+    tables = _SLICE_TABLES
+    taps = list(enumerate(_GEN_TAPS))
+
+    for pos in range(length):
+        column = block[pos::length]
+        top = state[25:]
+        state = [int(column.translate(table), 2) for table in tables] + state[:25]
+        for bit, gens in taps:
+            for gen in gens:
+                state[bit] ^= top[gen]
+
+    return state
+
+
+def verify_sliced(rows: Iterable[bytes], chk: int = 1) -> list[bool]:
+    """Check the bech32m checksum of equal-length rows of symbols at once,
+    same as comparing `polymod(row, chk)` of every row to BECH32M"""
+    rows = list(rows)
+    if not rows:
+        return []
+
+    ones = (1 << len(rows)) - 1
+    mismatch = 0
+    for bit, value in enumerate(polymod_sliced(rows, chk)):
+        mismatch |= value ^ (ones if BECH32M >> bit & 1 else 0)
+    return [flag == "0" for flag in format(mismatch, f"0{len(rows)}b")]
+
+
 def hrp_expand(s: Union[str, list[str]]) -> bytes:
     """Code taken from the bip-0350 bech32m specification"""
     return bytes([ord(x) >> 5 for x in s] + [0] + [ord(x) & 31 for x in s])
 
 
+@lru_cache(maxsize=HRP_CACHE_SIZE)
+def hrp_state(hrp: str) -> int:
+    """Polymod state reached after the expanded human readable part"""
+    return polymod(hrp_expand(hrp))
+
+
+def hrp_cache_hit_rate() -> float:
+    """Fraction of `hrp_state` calls served from the cache"""
+    info = hrp_state.cache_info()
+    total = info.hits + info.misses
+    return info.hits / total if total else 0.0
+
+
+def _checksum_state(hrp: Union[str, list[str]]) -> int:
+    # Lists are not hashable, so they can't go through the cache
+    if isinstance(hrp, str):
+        return hrp_state(hrp)
+    return polymod(hrp_expand(hrp))
+
+
+class Bech32mChecksum:
+    """Incremental bech32m checksum in the style of hashlib objects
+
+    Starts from the state after the expanded `hrp`, data symbols can then be
+    added in chunks with `update`. `copy` forks the state, so a common prefix
+    is processed only once for many different suffixes.
+    """
+
+    __slots__ = ("state",)
+
+    def __init__(self, hrp: Union[str, list[str]], symbols: bytes = b"") -> None:
+        self.state = polymod(symbols, _checksum_state(hrp))
+
+    def update(self, symbols: bytes) -> None:
+        """Add 5-bit symbols to the checksummed data"""
+        self.state = polymod(symbols, self.state)
+
+    def copy(self) -> "Bech32mChecksum":
+        """Independent copy of the current state"""
+        clone = Bech32mChecksum.__new__(Bech32mChecksum)
+        clone.state = self.state
+        return clone
+
+    def digest(self, encoding: Encoding = Encoding.BECH32M) -> bytes:
+        """The 6 checksum symbols to append to the data seen so far"""
+        mod = polymod(bytes(BECH32M_CHECKSUM_LENGTH), self.state)
+        mod ^= encoding.constant
+        return bytes([(mod >> 5 * (5 - i)) & 31 for i in range(6)])
+
+    def verify(self, encoding: Encoding = Encoding.BECH32M) -> bool:
+        """Check if the data seen so far ends with a valid checksum"""
+        return self.state == encoding.constant
+
+    def encoding(self) -> Union[Encoding, None]:
+        """Variant of the valid checksum the data end with, if any"""
+        return _ENCODINGS.get(self.state)
+
+
 def verify_checksum(hrp: Union[str, list[str]], data: bytes) -> Union[int, None]:
-    """Code taken from the bip-0350 bech32m specification"""
-    check = polymod(hrp_expand(hrp) + data)
-    if check != BECH32M:
+    """Code based on the bip-0350 bech32m specification"""
+    if not Bech32mChecksum(hrp, data).verify():
         return None
-    return check
+    return BECH32M
 
 
-def create_checksum(hrp: str, data: bytes) -> bytes:
+def create_checksum(
+    hrp: str, data: bytes, encoding: Encoding = Encoding.BECH32M
+) -> bytes:
     """Code based on the bip-0350 bech32m specification"""
-    values = hrp_expand(hrp) + data
-    mod = polymod(values + bytes([0, 0, 0, 0, 0, 0])) ^ BECH32M
-    return bytes([(mod >> 5 * (5 - i)) & 31 for i in range(6)])
+    return Bech32mChecksum(hrp, data).digest(encoding)
 
 
-def check_human(human: str) -> None:
-    """Check if the human readable part satisfies the specification constraints"""
+def _human_status(human: str) -> Status:
     if len(human) < 1 or len(human) > 83:
-        raise ValueError(
-            f"Human-readable part length has to be in range [1-83], but is {len(human)}"
-        )
+        return Status.HRP_LENGTH
 
     if any(True for char in human if ord(char) < 33 or ord(char) > 126):
-        raise ValueError(
-            "Human-readable part character out of range, acceptable range is [33-126]"
-        )
+        return Status.HRP_CHARACTER
+
+    return Status.OK
+
+
+def check_human(human: str) -> None:
+    """Check if the human readable part satisfies the specification constraints"""
+    status = _human_status(human)
+    if status == Status.HRP_LENGTH:
+        raise Bech32mError(status, (len(human),))
+    if status:
+        raise Bech32mError(status)
+
+
+def _to_symbols(b32str: Union[str, bytes]) -> Union[bytes, None]:
+    """Symbol values of the charset characters, None if there is another one"""
+    if isinstance(b32str, str):
+        if not b32str.isascii():
+            return None
+        b32str = b32str.encode("ascii")
+
+    # Mapping and validation in one pass, invalid characters get deleted
+    symbols = b32str.translate(_FROM_CHARSET, _NOT_CHARSET)
+    if len(symbols) != len(b32str):
+        return None
+    return symbols
 
 
-def base32_to_bytes(b32str: str) -> bytes:
+def base32_to_bytes(b32str: Union[str, bytes]) -> bytes:
     """Convert base32 string into 5-bit byte sequence"""
-    byte_array = bytearray(len(b32str))
+    symbols = _to_symbols(b32str)
+    if symbols is None:
+        raise Bech32mError(Status.INVALID_CHARACTER)
+
+    return symbols
+
 
-    for idx, _ in enumerate(b32str):
-        byte_array[idx] = BECH32M_CHARSET.index(b32str[idx])
+def bytes_to_base32(data: bytes) -> str:
+    """Convert 5-bit byte sequence into base32 string"""
+    return data.translate(_TO_CHARSET).decode("ascii")
 
-    return bytes(byte_array)
 
+def encode(
+    human: str,
+    raw_data: bytes,
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+    encoding: Encoding = Encoding.BECH32M,
+) -> str:
+    """Encoding of `human` and `raw_data` into a bech32m string
 
-def encode(human: str, raw_data: bytes) -> str:
-    """Encoding of `human` and `raw_data` into a bech32m string"""
+    `max_length` of None lifts the length limit, the checksum only keeps its
+    guarantees up to `BECH32M_LONG_MAX_LENGTH` characters though. `encoding`
+    selects the legacy bech32 checksum instead.
+    """
     check_human(human)
 
     data = encode_data(raw_data)
 
     # Bech32 string has max length of 90
     strlen = len(human) + len("1") + len(data) + BECH32M_CHECKSUM_LENGTH
-    if strlen > BECH32M_MAX_LENGTH:
-        raise ValueError(f"Bech32 string is too long ({strlen}), maximum length is 90")
+    if max_length is not None and strlen > max_length:
+        raise Bech32mError(Status.TOO_LONG, (strlen, max_length))
 
     # Human needs to be lowercase for checksum calculation
     # Encoder also always output lowercase
     human = human.lower()
 
     # Format = | Human readable part | 1 | data + checksum(data)
-    data_part = data + create_checksum(human, data)
-    return human + "1" + "".join(BECH32M_CHARSET[i] for i in data_part)
+    data_part = data + create_checksum(human, data, encoding)
+    return human + "1" + bytes_to_base32(data_part)
+
+
+def encode_into(
+    human: str,
+    raw_data: bytes,
+    out: bytearray,
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+    encoding: Encoding = Encoding.BECH32M,
+) -> int:
+    """Encode `human` and `raw_data` given as any buffer into the writable
+    buffer `out` as ASCII, returns the number of bytes written
+
+    The result, the errors and `encoding` are the same as with `encode`.
+    """
+    check_human(human)
+
+    # Slices of bytes are read faster than the ones of a memoryview
+    data = memoryview(raw_data).tobytes()
+    # Symbols of the complete 5-bit groups and the padding one unless it is zero
+    count, rest = divmod(len(data) * 8, 5)
+    padding = _encode_padding(data[-1] if data else 0, rest)
+    count += len(padding)
+
+    strlen = len(human) + len("1") + count + BECH32M_CHECKSUM_LENGTH
+    if max_length is not None and strlen > max_length:
+        raise Bech32mError(Status.TOO_LONG, (strlen, max_length))
+
+    target = memoryview(out).cast("B")
+    if strlen > len(target):
+        raise ValueError(f"Output buffer is too small, {strlen} bytes are needed")
+
+    # Translating to the charset takes a pass over the symbols anyway, so they
+    # are collected with their checksum and translated on the way into `out`
+    human = human.lower()
+    start = len(human) + len("1")
+    target[:start] = (human + "1").encode("ascii")
+    symbols = bytearray()
+    _encode_bits(data, symbols, 0, 0, 0)
+    symbols += padding
+
+    # The 30-bit checksum is exactly three 10-bit pairs of symbols
+    zeros = bytes(BECH32M_CHECKSUM_LENGTH)
+    mod = polymod(zeros, polymod(symbols, hrp_state(human))) ^ encoding.constant
+    pairs = _SYMBOL_PAIRS
+    symbols += pairs[mod >> 20] + pairs[mod >> 10 & 0x3FF] + pairs[mod & 0x3FF]
+    target[start:strlen] = symbols.translate(_TO_CHARSET)
+
+    return strlen
+
+
+class StreamEncoder:
+    """Encode data fed in chunks into a long bech32m string
+
+    `feed` and `finish` return the next pieces of the string, so neither the
+    data nor the string have to be held in memory as a whole. The result is
+    the same as `encode` of all the chunks joined.
+    """
+
+    def __init__(
+        self, human: str, max_length: Union[int, None] = BECH32M_LONG_MAX_LENGTH
+    ) -> None:
+        check_human(human)
+        self.human = human.lower()
+        self._max_length = max_length
+        self._length = len(human) + len("1") + BECH32M_CHECKSUM_LENGTH
+        self._checksum = Bech32mChecksum(self.human)
+        self._prefix = self.human + "1"
+        self._reg = 0
+        self._stored_bits = 0
+
+    def _emit(self, symbols: bytes) -> str:
+        self._length += len(symbols)
+        if self._max_length is not None and self._length > self._max_length:
+            raise Bech32mError(Status.TOO_LONG, (self._length, self._max_length))
+
+        self._checksum.update(symbols)
+        text = self._prefix + bytes_to_base32(symbols)
+        self._prefix = ""
+        return text
+
+    def feed(self, raw_data: bytes) -> str:
+        """Encode the next chunk of data"""
+        symbols = bytearray()
+        _, self._reg, self._stored_bits = _encode_bits(
+            raw_data, symbols, 0, self._reg, self._stored_bits
+        )
+        return self._emit(symbols)
+
+    def finish(self) -> str:
+        """Encode the leftover bits and append the checksum"""
+        text = self._emit(_encode_padding(self._reg, self._stored_bits))
+        return text + bytes_to_base32(self._checksum.digest())
+
+
+@lru_cache(maxsize=None)
+def _syndrome_tables() -> Tuple[list[list[int]], dict[int, Tuple[int, int]]]:
+    """Residues caused by single-symbol errors, built on first use
+
+    `syndromes[p][e]` is the value an error `e` (xor of the wrong and the right
+    symbol) located `p` symbols before the end adds to the polymod result,
+    `lookup` maps every such residue back to its `(p, e)`.
+    """
+    table_5 = POLYMOD_TABLE_5
+    syndromes = []
+    lookup = {}
+    row = list(range(32))
+    for position in range(SYNDROME_MAX_POSITIONS):
+        syndromes.append(row)
+        for error in range(1, 32):
+            lookup[row[error]] = (position, error)
+        # Move the errors one symbol further from the end
+        row = [((r & 0x1FFFFFF) << 5) ^ table_5[r >> 25] for r in row]
+
+    return syndromes, lookup
+
+
+def _hrp_corrections(hrp: str, data_len: int, residue: int) -> Iterator[str]:
+    """Human readable parts that differ from `hrp` in one character and
+    explain the checksum `residue` on their own"""
+    syndromes, lookup = _syndrome_tables()
+    hrp_len = len(hrp)
+
+    for idx, char in enumerate(hrp):
+        low_position = data_len + hrp_len - 1 - idx
+        high_position = data_len + 2 * hrp_len - idx
+        for high in range(4):
+            rest = residue ^ syndromes[high_position][high]
+            if rest == 0:
+                low = 0
+            else:
+                hit = lookup.get(rest)
+                if hit is None or hit[0] != low_position:
+                    continue
+                low = hit[1]
+
+            fixed = ord(char) ^ (high << 5 | low)
+            # Uppercase would make the string mixed case, so it can't be the fix
+            if 33 <= fixed <= 126 and not 65 <= fixed <= 90:
+                yield hrp[:idx] + chr(fixed) + hrp[idx + 1 :]
 
 
 def detect_single_error(hrp: str, data_bytes: bytes) -> Union[str, None]:
-    """Naive detection off single character error
+    """Locate a single character error from the checksum residue
 
-    Task:
-    "it suffices to implement a simplified
-    error detection that is able to identify just a _single_ symbol error in the
-    encoded string and suggest the correct input. This implementation can be done
-    naively by iterating over the possible choices and can be an optional feature in
-    case the input string is too large."
+    The polymod is linear, so `polymod(...) ^ BECH32M` of a string with one
+    wrong symbol equals the syndrome of that error alone and can be looked up
+    directly. A character of the human readable part occupies two expanded
+    symbols, for these the 4 possible changes of the upper bits are tried and
+    the rest is looked up. This takes O(length) lookups instead of a polymod
+    per tried character.
 
     returns correct string if found or None
     """
+    residue = polymod(data_bytes, _checksum_state(hrp)) ^ BECH32M
+    data_len = len(data_bytes)
+    if residue == 0 or data_len + 2 * len(hrp) + 1 > SYNDROME_MAX_POSITIONS:
+        return None
 
-    # Use mutable types for efficiency
-    human_part = list(hrp)
-    data_part = bytearray(data_bytes)
+    _, lookup = _syndrome_tables()
 
     # First start with data
-    for i, _ in enumerate(data_part):
-        for j, _ in enumerate(BECH32M_CHARSET):
-            data_part[i] = j
-            # Check if the string got fixed
-            is_valid = verify_checksum(human_part, data_part)
-            if is_valid:
-                return (
-                    "".join(human_part)
-                    + "1"
-                    + "".join(BECH32M_CHARSET[i] for i in data_part)
-                )
-
-            # Else return back the original value
-            data_part[i] = data_bytes[i]
+    hit = lookup.get(residue)
+    if hit is not None and hit[0] < data_len:
+        data_part = bytearray(data_bytes)
+        data_part[data_len - 1 - hit[0]] ^= hit[1]
+        return hrp + "1" + bytes_to_base32(data_part)
 
     # If data part didn't have the error, human part could
-    for i, _ in enumerate(hrp):
-        for j in range(33, 126):
-            human_part[i] = chr(j)
-            # Check if the string got fixed
-            is_valid = verify_checksum(human_part, data_part)
-            if is_valid:
-                return (
-                    "".join(human_part)
-                    + "1"
-                    + "".join(BECH32M_CHARSET[i] for i in data_part)
-                )
-
-            # Else return back the original value
-            human_part[i] = hrp[i]
+    fixed_hrp = next(_hrp_corrections(hrp, data_len, residue), None)
+    if fixed_hrp is not None:
+        return fixed_hrp + "1" + bytes_to_base32(data_bytes)
 
     return None
 
 
-def decode(string: str) -> Tuple[str, bytes]:
-    """Decode bech32m string into pair (hrp, data_bytes)"""
+def _erasure_basis(
+    positions: list[int],
+) -> Tuple[list[Tuple[int, int, int]], list[int]]:
+    """Gaussian elimination over GF(2) of the residues erasures can produce
 
-    if "1" not in string:
-        raise ValueError("Missing separator '1'")
+    Every erased symbol contributes 5 unknown bits, the bit `5 * k + b` of a
+    combination stands for the bit `b` of the `k`-th erasure. Returns the basis
+    as `(pivot, vector, combination)` and the combinations that produce no
+    residue at all, which only exist for strings longer than the code's
+    guarantees.
+    """
+    syndromes, _ = _syndrome_tables()
+    basis: list[Tuple[int, int, int]] = []
+    kernel = []
+
+    for k, position in enumerate(positions):
+        for bit in range(5):
+            vector, combination = _reduce(
+                basis, syndromes[position][1 << bit], 1 << (5 * k + bit)
+            )
+            if vector:
+                basis.append((1 << (vector.bit_length() - 1), vector, combination))
+            else:
+                kernel.append(combination)
+
+    return basis, kernel
+
+
+def _reduce(
+    basis: list[Tuple[int, int, int]], vector: int, combination: int = 0
+) -> Tuple[int, int]:
+    """Clear the pivot bits of `vector`, tracking the used basis combinations"""
+    for pivot, basis_vector, basis_combination in basis:
+        if vector & pivot:
+            vector ^= basis_vector
+            combination ^= basis_combination
+    return vector, combination
+
+
+def _data_corrections(
+    residue: int, data_len: int, erasures: list[int], max_errors: int
+) -> list[dict[int, int]]:
+    """Bounded-distance decoding of the data part
+
+    `erasures` are positions counted from the end of the data whose symbol is
+    unknown and was taken as 0. Returns every way of explaining `residue` with
+    values for the erasures and at most `max_errors` other wrong symbols, as
+    mappings from position to the value that has to be xored in.
+    """
+    syndromes, lookup = _syndrome_tables()
+    basis, kernel = _erasure_basis(erasures)
+    corrections = []
+
+    def add(remainder: int, fixes: dict[int, int]) -> None:
+        # The erasures have to explain whatever the errors did not
+        vector, combination = _reduce(basis, remainder)
+        if vector:
+            return
+        for mask in range(1 << len(kernel)):
+            solution = combination
+            for idx, kernel_combination in enumerate(kernel):
+                if mask >> idx & 1:
+                    solution ^= kernel_combination
+            correction = dict(fixes)
+            for k, position in enumerate(erasures):
+                correction[position] = solution >> 5 * k & 31
+            corrections.append(correction)
+
+    add(residue, {})
+    if max_errors < 1:
+        return corrections
+
+    if not erasures:
+        hit = lookup.get(residue)
+        if hit is not None and hit[0] < data_len:
+            corrections.append({hit[0]: hit[1]})
+    else:
+        # Compare the errors modulo what the erasures can produce
+        target, _ = _reduce(basis, residue)
+        erased = set(erasures)
+        for position in range(data_len):
+            if position in erased:
+                continue
+            bits = [
+                _reduce(basis, syndromes[position][1 << bit])[0] for bit in range(5)
+            ]
+            reduced = [0] * 32
+            for error in range(1, 32):
+                low = error & -error
+                reduced[error] = reduced[error ^ low] ^ bits[low.bit_length() - 1]
+                if reduced[error] == target:
+                    add(residue ^ syndromes[position][error], {position: error})
+
+    if max_errors < 2 or erasures:
+        return corrections
+
+    # Two errors: fix the first one and look up the rest, 31 lookups a position
+    for first in range(data_len):
+        row = syndromes[first]
+        for error in range(1, 32):
+            hit = lookup.get(residue ^ row[error])
+            if hit is not None and first < hit[0] < data_len:
+                corrections.append({first: error, hit[0]: hit[1]})
+
+    return corrections
+
+
+def _corrections(
+    hrp: str,
+    data_bytes: bytes,
+    max_errors: int,
+    erasures: Iterable[int] = (),
+    encodings: Iterable[Encoding] = (Encoding.BECH32M,),
+) -> list[str]:
+    """Every correction of `hrp` and `data_bytes` within the given distance,
+    `erasures` are indices into `data_bytes`
+
+    With several `encodings` only the corrections into the variant closest to
+    the input are returned, the one that needs the fewest changed characters.
+    """
+    data_len = len(data_bytes)
+    if data_len + 2 * len(hrp) + 1 > SYNDROME_MAX_POSITIONS:
+        return []
+
+    erased = sorted(set(data_len - 1 - idx for idx in erasures))
+    # Each erasure uses up one, each error two of the detectable symbols
+    max_errors = min(max_errors, (BECH32M_DETECTED_ERRORS - len(erased)) // 2)
+    if max_errors < 0:
+        raise ValueError(
+            f"At most {BECH32M_DETECTED_ERRORS} erasures can be corrected"
+        )
+
+    # The polymod is computed once, the variants differ in the residue only
+    mod = polymod(data_bytes, _checksum_state(hrp))
+    closest: list[Tuple[int, str]] = []
+    for encoding in encodings:
+        residue = mod ^ encoding.constant
+        candidates = []
+
+        for correction in _data_corrections(residue, data_len, erased, max_errors):
+            data_part = bytearray(data_bytes)
+            for position, error in correction.items():
+                data_part[data_len - 1 - position] ^= error
+            errors = len(correction) - len(erased)
+            candidates.append((errors, hrp + "1" + bytes_to_base32(data_part)))
+
+        # Errors in the human readable part are only looked for on their own
+        if residue != 0 and max_errors > 0 and not erased:
+            data_str = bytes_to_base32(data_bytes)
+            for fixed_hrp in _hrp_corrections(hrp, data_len, residue):
+                candidates.append((1, fixed_hrp + "1" + data_str))
+
+        if candidates and (not closest or min(candidates)[0] < min(closest)[0]):
+            closest = candidates
 
-    if len(string) > BECH32M_MAX_LENGTH:
-        raise ValueError("Bech32 string is too long, maximum length is 90")
+    return list(dict.fromkeys(candidate for _, candidate in closest))
 
-    if string.upper() != string and string.lower() != string:
-        raise ValueError("String has mixed upper and lower case, maybe a typo?")
 
+def find_corrections(
+    string: str, max_errors: int = 2, erasures: Iterable[int] = ()
+) -> list[str]:
+    """Find every valid bech32m string the input could have been
+
+    Up to `max_errors` characters may be wrong, `erasures` are indices of
+    characters known to be wrong, every '?' in the data part is an erasure
+    as well. Each erasure uses up one and each error two of the 4 wrong
+    characters the checksum is guaranteed to handle, so at most
+    `(4 - erasures) // 2` errors are looked for. Errors in the human readable
+    part are only corrected one at a time without erasures.
+
+    The cost is about 31 dictionary lookups per data character, independent
+    of the input.
+    """
     string = string.lower()
+    if "1" not in string:
+        raise Bech32mError(Status.MISSING_SEPARATOR)
 
     human, data = string.rsplit("1", maxsplit=1)
+    check_human(human)
+
+    erased = set(idx for idx, char in enumerate(data) if char == "?")
+    for idx in erasures:
+        if not len(human) < idx < len(string):
+            raise ValueError(f"Erasure at {idx} is not in the data part")
+        erased.add(idx - len(human) - 1)
+
+    if len(data) < BECH32M_CHECKSUM_LENGTH:
+        raise Bech32mError(Status.CHECKSUM_TOO_SHORT)
+
+    data_bytes = base32_to_bytes(
+        "".join("q" if idx in erased else char for idx, char in enumerate(data))
+    )
+
+    return _corrections(human, data_bytes, max_errors, erased)
 
-    # Check if there are only valid bech32m characters,
-    # if yes the data values are valid
-    if not all(True for x in data if x in BECH32M_CHARSET):
-        raise ValueError()
+
+def _as_bytes(string: Union[bytes, bytearray, memoryview]) -> bytes:
+    """Buffer as bytes, copied unless it already is bytes
+
+    Unlike `bytes` this rejects ints and other iterables.
+    """
+    if type(string) is bytes:
+        return string
+    try:
+        return bytes(memoryview(string))
+    except TypeError:
+        raise TypeError(
+            f"Expected str or a bytes-like object, got {type(string).__name__}"
+        ) from None
+
+
+def _check_string(
+    string: Union[str, bytes],
+    max_length: Union[int, None],
+    encodings: Iterable[Encoding] = (Encoding.BECH32M,),
+) -> Tuple[Status, str, bytes, Union[Encoding, None]]:
+    """Validate the string without raising, returns the status, the human
+    readable part, all data symbols including the checksum and the variant of
+    the checksum, which has to be one of `encodings`"""
+    separator = "1"
+    if not isinstance(string, str):
+        string = _as_bytes(string)
+        separator = b"1"
+
+    if separator not in string:
+        return Status.MISSING_SEPARATOR, "", b"", None
+
+    if max_length is not None and len(string) > max_length:
+        return Status.TOO_LONG, "", b"", None
+
+    lower = string.lower()
+    if lower != string and string.upper() != string:
+        return Status.MIXED_CASE, "", b"", None
+
+    human, data = lower.rsplit(separator, maxsplit=1)
+    if not isinstance(human, str):
+        human = human.decode("latin-1")
 
     if len(data) < BECH32M_CHECKSUM_LENGTH:
-        raise ValueError("Checksum is too short")
+        return Status.CHECKSUM_TOO_SHORT, human, b"", None
+
+    symbols = _to_symbols(data)
+    if symbols is None:
+        return Status.INVALID_CHARACTER, human, b"", None
+
+    status = _human_status(human)
+    if status:
+        return status, human, symbols, None
+
+    encoding = _ENCODINGS.get(polymod(symbols, hrp_state(human)))
+    if encoding not in encodings:
+        return Status.INVALID_CHECKSUM, human, symbols, None
+
+    return Status.OK, human, symbols, encoding
+
+
+class CheckResult(NamedTuple):
+    """Outcome of `check_string`"""
+
+    status: Status
+    human: str
+    symbols: bytes
+    encoding: Union[Encoding, None]
+
+
+def check_string(
+    string: Union[str, bytes],
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+    encodings: Iterable[Encoding] = _ALL_ENCODINGS,
+) -> CheckResult:
+    """Validate a string without raising or looking for corrections
+
+    `symbols` are all data symbols including the checksum and `encoding` the
+    variant of the valid checksum, one of `encodings`, or None with a status
+    that tells why the string is invalid.
+    """
+    return CheckResult(*_check_string(string, max_length, encodings))
+
+
+def is_valid(
+    string: Union[str, bytes], max_length: Union[int, None] = BECH32M_MAX_LENGTH
+) -> bool:
+    """Check if `string` is a valid bech32m string, ASCII bytes are accepted too
+
+    Fast path for validation only, the data are not decoded, no corrections
+    are looked for and nothing is raised, so invalid input costs no more
+    than valid input.
+    """
+    return _check_string(string, max_length)[0] == Status.OK
+
+
+def _decode_symbols(
+    string: Union[str, bytes],
+    max_errors: int,
+    correct: bool,
+    max_length: Union[int, None],
+    encodings: Iterable[Encoding] = (Encoding.BECH32M,),
+) -> Tuple[str, bytes, Encoding]:
+    """Validate the string, returns the human readable part, all data symbols
+    including the checksum and the variant of the checksum"""
+    status, human, data_bytes, encoding = _check_string(string, max_length, encodings)
+    if encoding is not None:
+        return human, data_bytes, encoding
+
+    if status == Status.TOO_LONG:
+        raise Bech32mError(status, (len(string), max_length))
+    if status == Status.HRP_LENGTH:
+        raise Bech32mError(status, (len(human),))
+    if status == Status.INVALID_CHECKSUM and correct and max_errors > 0:
+        corrections = _corrections(human, data_bytes, max_errors, (), encodings)
+        raise Bech32mError(status, (max_errors,), corrections)
+    raise Bech32mError(status)
+
+
+def decode(
+    string: Union[str, bytes],
+    max_errors: int = 1,
+    correct: bool = True,
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+) -> Tuple[str, bytes]:
+    """Decode bech32m string into pair (hrp, data_bytes)
+
+    Raises `Bech32mError`. When the checksum doesn't match and `correct` is
+    set, the error suggests every correction with at most `max_errors` wrong
+    characters. Without `correct` invalid input is rejected at the cost of
+    a valid one. `max_length` of None lifts the length limit. ASCII bytes are
+    accepted as well, so they don't have to be decoded to str first.
+    """
+    human, data_bytes, _ = _decode_symbols(string, max_errors, correct, max_length)
+    return (human, decode_data(data_bytes[:-BECH32M_CHECKSUM_LENGTH]))
+
+
+def decode_any(
+    string: Union[str, bytes],
+    max_errors: int = 1,
+    correct: bool = True,
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+) -> Tuple[Encoding, str, bytes]:
+    """Decode a bech32 or bech32m string into (encoding, hrp, data_bytes)
+
+    Same as `decode`, but legacy BIP-173 bech32 strings are accepted too. The
+    polymod is computed once and compared to the constants of both variants.
+    Suggested corrections are into the variant closer to the input.
+    """
+    human, data_bytes, encoding = _decode_symbols(
+        string, max_errors, correct, max_length, _ALL_ENCODINGS
+    )
+    return (encoding, human, decode_data(data_bytes[:-BECH32M_CHECKSUM_LENGTH]))
+
+
+def decode_into(
+    string: Union[str, bytes],
+    out: bytearray,
+    max_errors: int = 1,
+    correct: bool = True,
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+) -> int:
+    """Decode bech32m string given as any buffer into the writable buffer `out`
+
+    Returns the number of data bytes written to the start of `out`, the other
+    arguments and errors are the same as with `decode`. The human readable
+    part is not returned, it is everything before the last '1' of the input,
+    so a reused scratch buffer is all that a decoding loop needs.
+    """
+    _, data_bytes, _ = _decode_symbols(string, max_errors, correct, max_length)
+    symbols = data_bytes[:-BECH32M_CHECKSUM_LENGTH]
+
+    # The padding byte is left out when it is zero, so the exact size is only
+    # computed when `out` has no room for a padding byte
+    target = memoryview(out).cast("B")
+    if (len(symbols) * 5 + 7) // 8 > len(target):
+        size = len(decode_data(symbols))
+        if size > len(target):
+            raise ValueError(f"Output buffer is too small, {size} bytes are needed")
+
+    pos, reg, stored_bits = _decode_bits(symbols, target, 0, 0, 0)
+    padding = _decode_padding(reg, stored_bits)
+    target[pos : pos + len(padding)] = padding
+    return pos + len(padding)
+
+
+class DecodeCache:
+    """Size-bounded LRU cache in front of `decode`
+
+    Errors are cached along with the decoded pairs, including the suggested
+    corrections, so a repeated invalid string doesn't search for corrections
+    again. Entries older than `ttl` seconds are decoded again. Safe to share
+    between threads.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DECODE_CACHE_SIZE,
+        ttl: Union[float, None] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError("Cache capacity has to be at least 1")
+        self.capacity = capacity
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Decode arguments to the expiry time and the outcome, oldest use first
+        self._entries: OrderedDict[
+            tuple, Tuple[float, Union[Tuple[str, bytes], Bech32mError]]
+        ] = OrderedDict()
+        # Keys of the entries of every string, for `invalidate`
+        self._keys: dict[Union[str, bytes], set[tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def decode(
+        self,
+        string: Union[str, bytes],
+        max_errors: int = 1,
+        correct: bool = True,
+        max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+    ) -> Tuple[str, bytes]:
+        """Same as `decode`, served from the cache when possible"""
+        if not isinstance(string, str):
+            # Buffers like bytearray aren't hashable
+            string = _as_bytes(string)
+        key = (string, max_errors, correct, max_length)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            outcome: Union[Tuple[str, bytes], Bech32mError]
+            try:
+                outcome = decode(string, max_errors, correct, max_length)
+            except Bech32mError as ex:
+                outcome = ex
+            expiry = now + self.ttl if self.ttl is not None else float("inf")
+            entry = (expiry, outcome)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self._keys.setdefault(string, set()).add(key)
+                while len(self._entries) > self.capacity:
+                    self._remove(next(iter(self._entries)))
+                    self.evictions += 1
+
+        outcome = entry[1]
+        if isinstance(outcome, Bech32mError):
+            # A new instance, raising the cached one would grow its traceback
+            raise Bech32mError(outcome.status, outcome.details, outcome.suggestions)
+        return outcome
+
+    def invalidate(self, string: Union[str, bytes, None] = None) -> None:
+        """Drop the entries of `string`, or all entries without a string"""
+        with self._lock:
+            if string is None:
+                self._entries.clear()
+                self._keys.clear()
+                return
+            if not isinstance(string, str):
+                string = _as_bytes(string)
+            for key in self._keys.pop(string, ()):
+                del self._entries[key]
+
+    def _remove(self, key: tuple) -> None:
+        # Called with the lock held
+        del self._entries[key]
+        keys = self._keys[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._keys[key[0]]
+
+    def stats(self) -> dict[str, int]:
+        """Counters for export, along with the current size and capacity"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "capacity": self.capacity,
+            }
+
+
+class DecodeResult(NamedTuple):
+    """Outcome of decoding one string of a batch"""
+
+    status: Status
+    human: str
+    data: bytes
+
+
+class EncodeResult(NamedTuple):
+    """Outcome of encoding one payload of a batch"""
+
+    status: Status
+    string: str
+
+
+def decode_many(
+    strings: Iterable[Union[str, bytes]],
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+    engine: str = "table",
+) -> list[DecodeResult]:
+    """Decode a batch of strings, failures are reported per item
+
+    No corrections are looked for, the `status` of a failed item tells why it
+    is invalid and its `human` and `data` are empty. Only items that are
+    neither str nor a bytes-like object raise TypeError.
+    The checks of `decode` are inlined, every human readable part is checked
+    and its checksum state looked up once per batch and the data of up to
+    `DECODE_ROWS` valid strings are converted together.
+
+    The "sliced" `engine` verifies the checksums of strings of the same length
+    and human readable part together with `verify_sliced`, which pays off for
+    batches of a thousand or more such strings.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    sliced = engine == "sliced"
+    # Strings left for the sliced engine, by checksum state and length
+    pending: dict[Tuple[int, int], list[Tuple[int, str, bytes]]] = {}
+
+    results: list[DecodeResult] = []
+    append = results.append
+    # Valid items with their data symbols, decoded together by `flush`
+    valid: list[Tuple[int, str, bytes]] = []
+
+    def flush() -> None:
+        decoded = _decode_rows([symbols for _, _, symbols in valid])
+        for (index, human, _), data in zip(valid, decoded):
+            results[index] = DecodeResult(Status.OK, human, data)
+        valid.clear()
+
+    # Status, str form and checksum state of every human readable part seen
+    humans: dict[bytes, Tuple[Status, str, int]] = {}
+    from_charset = _FROM_CHARSET
+    not_charset = _NOT_CHARSET
+    checksum_length = BECH32M_CHECKSUM_LENGTH
+
+    for string in strings:
+        if isinstance(string, str):
+            if not string.isascii():
+                # Rare, leave the unicode case rules to the general check
+                append(DecodeResult(_check_string(string, max_length)[0], "", b""))
+                continue
+            string = string.encode("ascii")
+        else:
+            string = _as_bytes(string)
 
-    data_bytes = base32_to_bytes(data)
+        separator = string.rfind(b"1")
+        if separator < 0:
+            append(DecodeResult(Status.MISSING_SEPARATOR, "", b""))
+            continue
+        if max_length is not None and len(string) > max_length:
+            append(DecodeResult(Status.TOO_LONG, "", b""))
+            continue
+
+        # Only strings that are not all lowercase are copied
+        lower = string
+        if not string.islower():
+            lower = string.lower()
+            if lower != string and not string.isupper():
+                append(DecodeResult(Status.MIXED_CASE, "", b""))
+                continue
+
+        data = lower[separator + 1 :]
+        if len(data) < checksum_length:
+            append(DecodeResult(Status.CHECKSUM_TOO_SHORT, "", b""))
+            continue
+
+        symbols = data.translate(from_charset, not_charset)
+        if len(symbols) != len(data):
+            append(DecodeResult(Status.INVALID_CHARACTER, "", b""))
+            continue
+
+        hrp = lower[:separator]
+        known = humans.get(hrp)
+        if known is None:
+            human = hrp.decode("latin-1")
+            status = _human_status(human)
+            known = humans[hrp] = (status, human, 0 if status else hrp_state(human))
+        status, human, state = known
+        if status:
+            append(DecodeResult(status, "", b""))
+            continue
+
+        if sliced:
+            group = pending.setdefault((state, len(symbols)), [])
+            group.append((len(results), human, symbols))
+            append(DecodeResult(Status.INVALID_CHECKSUM, "", b""))
+            continue
+
+        if polymod(symbols, state) != BECH32M:
+            append(DecodeResult(Status.INVALID_CHECKSUM, "", b""))
+            continue
+
+        valid.append((len(results), human, symbols[:-checksum_length]))
+        append(DecodeResult(Status.OK, human, b""))
+        if len(valid) >= DECODE_ROWS:
+            flush()
+
+    for (state, _), group in pending.items():
+        checked = verify_sliced([symbols for _, _, symbols in group], state)
+        for (index, human, symbols), ok in zip(group, checked):
+            if ok:
+                valid.append((index, human, symbols[:-checksum_length]))
+    flush()
+
+    return results
+
+
+def _decode_rows(rows: list[bytes]) -> list[bytes]:
+    """`decode_data` of every row of 5-bit groups, converted together
+
+    Every row is padded with zero bits to whole bytes, so all of them are read
+    as one integer. The last byte of a row is its padding byte when the bits
+    don't fill it, dropped when it is zero as in `decode_data`.
+    """
+    symbol_bits = _SYMBOL_BITS
+    bits: list[str] = []
+    for symbols in rows:
+        bits += map(symbol_bits.__getitem__, symbols)
+        bits.append("0" * (-5 * len(symbols) % 8))
+    joined = "".join(bits)
+    block = int(joined or "0", 2).to_bytes(len(joined) // 8, "big")
+
+    decoded = []
+    pos = 0
+    for symbols in rows:
+        size, rest = divmod(len(symbols) * 5, 8)
+        end = pos + size + (rest > 0)
+        data = block[pos:end]
+        if rest and not block[end - 1]:
+            data = data[:-1]
+        decoded.append(data)
+        pos = end
+    return decoded
+
+
+def encode_many(
+    human: str,
+    payloads: Iterable[bytes],
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+    encoding: Encoding = Encoding.BECH32M,
+) -> list[EncodeResult]:
+    """Encode a batch of payloads under one human readable part
+
+    The human readable part is checked, raising `Bech32mError`, and its
+    checksum state computed once for the whole batch. Payloads that don't fit
+    into `max_length` get the TOO_LONG status and an empty string. `encoding`
+    selects the legacy bech32 checksum instead.
+    """
     check_human(human)
+    human = human.lower()
+    prefix = human + "1"
+    overhead = len(prefix) + BECH32M_CHECKSUM_LENGTH
+    state = hrp_state(human)
+    zeros = bytes(BECH32M_CHECKSUM_LENGTH)
+    pairs = _SYMBOL_PAIRS
+    constant = encoding.constant
 
-    enc = verify_checksum(human, data_bytes)
-    if not enc:
-        is_fixable = detect_single_error(human, data_bytes)
-        if is_fixable:
-            raise ValueError(
-                f"The string is not valid, did you mean to use '{is_fixable}' instead?"
-            )
-        raise ValueError(
-            "The string is not valid and it contains more than one incorrect character."
+    results: list[EncodeResult] = []
+    append = results.append
+    for raw_data in payloads:
+        symbols = bytearray()
+        _, reg, stored_bits = _encode_bits(raw_data, symbols, 0, 0, 0)
+        symbols += _encode_padding(reg, stored_bits)
+
+        if max_length is not None and overhead + len(symbols) > max_length:
+            append(EncodeResult(Status.TOO_LONG, ""))
+            continue
+
+        # The 30-bit checksum is exactly three 10-bit pairs of symbols
+        mod = polymod(zeros, polymod(symbols, state)) ^ constant
+        symbols += pairs[mod >> 20]
+        symbols += pairs[mod >> 10 & 0x3FF]
+        symbols += pairs[mod & 0x3FF]
+        append(EncodeResult(Status.OK, prefix + bytes_to_base32(symbols)))
+
+    return results
+
+
+class StreamDecoder:
+    """Decode a long bech32m string fed in chunks
+
+    `feed` returns the data decoded so far, holding back the symbols that may
+    turn out to be the checksum. The checksum is verified by `finish`, so the
+    returned data must not be trusted before it succeeds. No corrections are
+    looked for. `human` is set once the separator is found.
+    """
+
+    # The separator follows a human readable part of at most 83 characters
+    _HEAD_LENGTH = 84
+
+    def __init__(
+        self, max_length: Union[int, None] = BECH32M_LONG_MAX_LENGTH
+    ) -> None:
+        self.human: Union[str, None] = None
+        self._max_length = max_length
+        self._length = 0
+        self._head = ""
+        self._seen_lower = False
+        self._seen_upper = False
+        self._checksum: Union[Bech32mChecksum, None] = None
+        self._pending = bytearray()
+        self._reg = 0
+        self._stored_bits = 0
+
+    def _split_head(self) -> str:
+        separator = self._head.rfind("1", 0, self._HEAD_LENGTH)
+        if separator < 0:
+            raise Bech32mError(Status.MISSING_SEPARATOR)
+
+        human = self._head[:separator]
+        check_human(human)
+        self.human = human
+        self._checksum = Bech32mChecksum(human)
+        rest = self._head[separator + 1 :]
+        self._head = ""
+        return rest
+
+    def _decode_symbols(self, text: str) -> bytes:
+        # Raises on characters that are not in the charset
+        symbols = base32_to_bytes(text)
+        self._checksum.update(symbols)
+
+        pending = self._pending + symbols
+        self._pending = pending[-BECH32M_CHECKSUM_LENGTH:]
+        decoded = bytearray()
+        _, self._reg, self._stored_bits = _decode_bits(
+            pending[:-BECH32M_CHECKSUM_LENGTH],
+            decoded,
+            0,
+            self._reg,
+            self._stored_bits,
         )
+        return bytes(decoded)
 
-    return (human, decode_data(data_bytes[:-BECH32M_CHECKSUM_LENGTH]))
+    def feed(self, text: str) -> bytes:
+        """Decode the next chunk of the string"""
+        self._length += len(text)
+        if self._max_length is not None and self._length > self._max_length:
+            raise Bech32mError(Status.TOO_LONG, (self._length, self._max_length))
 
+        self._seen_lower |= text != text.upper()
+        self._seen_upper |= text != text.lower()
+        if self._seen_lower and self._seen_upper:
+            raise Bech32mError(Status.MIXED_CASE)
+        text = text.lower()
 
-def decode_data(data: bytes) -> bytes:
-    """Transform 5-bit byte groups into full 8-bit bytes"""
-    decoded_bytes = bytearray()
-    reg = 0
-    stored_bits = 0
+        if self.human is None:
+            self._head += text
+            if len(self._head) <= self._HEAD_LENGTH:
+                return b""
+            text = self._split_head()
+
+        return self._decode_symbols(text)
 
+    def finish(self) -> bytes:
+        """Decode the leftover bits and verify the checksum"""
+        decoded = b""
+        if self.human is None:
+            decoded = self._decode_symbols(self._split_head())
+
+        if len(self._pending) < BECH32M_CHECKSUM_LENGTH:
+            raise Bech32mError(Status.CHECKSUM_TOO_SHORT)
+
+        if not self._checksum.verify():
+            raise Bech32mError(Status.INVALID_CHECKSUM)
+
+        return decoded + _decode_padding(self._reg, self._stored_bits)
+
+
+def _decode_bytewise(
+    data: bytes, decoded_bytes: bytearray, reg: int, stored_bits: int
+) -> Tuple[int, int]:
     for byte in data:
         # We need to hold at most 12 bits
         reg = ((reg << 5) | byte) & 0xFFF
@@ -190,19 +1381,60 @@ def decode_data(data: bytes) -> bytes:
             # Shift it to start and take only the complete 8 bits
             decoded_bytes.append((reg >> stored_bits) & 0xFF)
 
+    return reg, stored_bits
+
+
+def _decode_bits(
+    data: bytes, target: bytearray, pos: int, reg: int, stored_bits: int
+) -> Tuple[int, int, int]:
+    """Write the complete bytes of 5-bit groups `data` to `target` from `pos`,
+    continuing from and returning the position and the register state
+
+    `target` is a bytearray, written at its end to grow it, or a writable
+    memoryview with room for the bytes. Only the symbols that empty the
+    register go through it bit by bit, the rest are joined into one integer
+    and its bits short of a byte are left in the register.
+    """
+    head = min((-5 * stored_bits) % 8, len(data))
+    if head:
+        decoded_bytes = bytearray()
+        reg, stored_bits = _decode_bytewise(
+            data[:head], decoded_bytes, reg, stored_bits
+        )
+        target[pos : pos + len(decoded_bytes)] = decoded_bytes
+        pos += len(decoded_bytes)
+
+    if len(data) > head:
+        symbol_bits = _SYMBOL_BITS
+        bits = "".join([symbol_bits[symbol] for symbol in data[head:]])
+        size, stored_bits = divmod(len(bits), 8)
+        value = int(bits, 2)
+        target[pos : pos + size] = (value >> stored_bits).to_bytes(size, "big")
+        pos += size
+        reg = value & 0xFF
+
+    return pos, reg, stored_bits
+
+
+def _decode_padding(reg: int, stored_bits: int) -> bytes:
     # Padd the data if there is an incomplete byte from the LSB side
     if stored_bits > 0 and (reg << (8 - stored_bits)) & 0xFF != 0:
-        decoded_bytes.append((reg << (8 - stored_bits)) & 0xFF)
+        return bytes([(reg << (8 - stored_bits)) & 0xFF])
+    return b""
 
-    return bytes(decoded_bytes)
 
+def decode_data(data: bytes) -> bytes:
+    """Transform 5-bit byte groups into full 8-bit bytes"""
+    decoded_bytes = bytearray()
+    _, reg, stored_bits = _decode_bits(data, decoded_bytes, 0, 0, 0)
+    decoded_bytes += _decode_padding(reg, stored_bits)
+
+    return bytes(decoded_bytes)
 
-def encode_data(data: bytes) -> bytes:
-    """Transform 8-bit byte groups into smaller 5-bit bytes"""
-    encoded_bytes = bytearray()
-    reg = 0
-    stored_bits = 0
 
+def _encode_bytewise(
+    data: bytes, encoded_bytes: bytearray, reg: int, stored_bits: int
+) -> Tuple[int, int]:
     for byte in data:
         # We need to hold at most 12 bits
         reg = ((reg << 8) | byte) & 0xFFF
@@ -211,8 +1443,69 @@ def encode_data(data: bytes) -> bytes:
             stored_bits -= 5
             encoded_bytes.append((reg >> stored_bits) & 0x1F)
 
+    return reg, stored_bits
+
+
+def _encode_bits(
+    data: bytes, target: bytearray, pos: int, reg: int, stored_bits: int
+) -> Tuple[int, int, int]:
+    """Write the complete 5-bit groups of `data` to `target` from `pos`,
+    continuing from and returning the position and the register state
+
+    `target` is a bytearray or a writable memoryview, as with `_decode_bits`.
+    Once the register is empty, blocks of 5 bytes are exactly 8 symbols, so
+    each block is read as one integer and split with a 10-bit lookup table.
+    Only the bytes that empty the register go through it bit by bit, the bits
+    after the last complete symbol are left in it.
+    """
+    head = min((-2 * stored_bits) % 5, len(data))
+    if head:
+        encoded_bytes = bytearray()
+        reg, stored_bits = _encode_bytewise(
+            data[:head], encoded_bytes, reg, stored_bits
+        )
+        target[pos : pos + len(encoded_bytes)] = encoded_bytes
+        pos += len(encoded_bytes)
+
+    if len(data) > head:
+        pairs = _SYMBOL_PAIRS
+        from_bytes = int.from_bytes
+        end = head + (len(data) - head) // 5 * 5
+        blocks = []
+        for idx in range(head, end, 5):
+            block = from_bytes(data[idx : idx + 5], "big")
+            blocks += (
+                pairs[block >> 30],
+                pairs[block >> 20 & 0x3FF],
+                pairs[block >> 10 & 0x3FF],
+                pairs[block & 0x3FF],
+            )
+        if end < len(data):
+            # A short last block is read as the top bytes of a full one and
+            # only its complete symbols are kept
+            block = from_bytes(data[end:], "big") << 8 * (end + 5 - len(data))
+            blocks += (pairs[block >> 30], pairs[block >> 20 & 0x3FF])
+            blocks += (pairs[block >> 10 & 0x3FF],)
+
+        size, stored_bits = divmod((len(data) - head) * 8, 5)
+        target[pos : pos + size] = b"".join(blocks)[:size]
+        pos += size
+        reg = data[-1]
+
+    return pos, reg, stored_bits
+
+
+def _encode_padding(reg: int, stored_bits: int) -> bytes:
     # If there are any non-zero leftovers, padd them to 5 bit group
     if stored_bits != 0 and (reg << (5 - stored_bits)) & 0x1F != 0:
-        encoded_bytes.append((reg << (5 - stored_bits)) & 0x1F)
+        return bytes([(reg << (5 - stored_bits)) & 0x1F])
+    return b""
+
+
+def encode_data(data: bytes) -> bytes:
+    """Transform 8-bit byte groups into smaller 5-bit bytes"""
+    encoded_bytes = bytearray()
+    _, reg, stored_bits = _encode_bits(data, encoded_bytes, 0, 0, 0)
+    encoded_bytes += _encode_padding(reg, stored_bits)
 
     return bytes(encoded_bytes)
@@ -0,0 +1,190 @@
+"""asyncio interface of bech32m for event-loop services
+
+Strings are checked inline, that is cheap. Only the search for corrections of
+a string with an invalid checksum runs in an executor, so slow inputs never
+block the event loop.
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, AsyncIterator, Deque, Optional, Tuple, Union
+
+import bech32m
+from bech32m import BECH32M_MAX_LENGTH, Bech32mError, Status
+
+# Corrections searched for at the same time and lines of a stream in flight
+MAX_PENDING = 8
+
+# What a line of a stream decodes to, the `(human, data)` pair or the error
+Outcome = Union[Tuple[str, bytes], Exception]
+
+
+def _decode_outcome(
+    string: Union[str, bytes], max_errors: int, max_length: Union[int, None]
+) -> Outcome:
+    # Runs in the executor, errors are returned to be passed on as they are
+    try:
+        return bech32m.decode(string, max_errors, True, max_length)
+    except Bech32mError as ex:
+        return ex
+
+
+def _release(loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore) -> None:
+    # Called from the thread that finished the job
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:
+        # The loop is closed, nobody waits for the slot anymore
+        pass
+
+
+class AsyncDecoder:
+    """Decoder for event loops with a bounded executor for the corrections
+
+    At most `max_pending` corrections are queued or running at once, more of
+    them wait for a free slot. A correction that takes longer than `timeout`
+    seconds raises `asyncio.TimeoutError`, its slot is only freed once the
+    executor is done with it. Without an `executor` a process pool
+    of `max_pending` workers is started on first use and shut down by `close`.
+    """
+
+    def __init__(
+        self,
+        max_errors: int = 1,
+        max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+        timeout: Optional[float] = None,
+        max_pending: int = MAX_PENDING,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.max_errors = max_errors
+        self.max_length = max_length
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._executor = executor
+        self._own_executor = executor is None
+        self._slots = asyncio.Semaphore(max_pending)
+
+    def _check(self, string: Union[str, bytes]) -> Optional[Outcome]:
+        """Outcome of the cheap checks, None if corrections have to be found"""
+        try:
+            return bech32m.decode(string, correct=False, max_length=self.max_length)
+        except Bech32mError as ex:
+            if ex.status == Status.INVALID_CHECKSUM and self.max_errors > 0:
+                return None
+            return ex
+
+    async def _correct(self, string: Union[str, bytes]) -> Outcome:
+        """Outcome of decoding with corrections, found in the executor"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_pending)
+
+        loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        try:
+            job = self._executor.submit(
+                _decode_outcome, string, self.max_errors, self.max_length
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job is done, not only until the timeout,
+        # so jobs that timed out still count against `max_pending`
+        job.add_done_callback(lambda _: _release(loop, self._slots))
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(job)), self.timeout
+            )
+        except asyncio.TimeoutError as ex:
+            # Only a job that hasn't started yet can be dropped
+            job.cancel()
+            return ex
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    async def decode(self, string: Union[str, bytes]) -> Tuple[str, bytes]:
+        """Same as `bech32m.decode`, only the correction runs in the executor"""
+        outcome = self._check(string)
+        if outcome is None:
+            outcome = await self._correct(string)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def stream(
+        self, reader: asyncio.StreamReader
+    ) -> AsyncIterator[Tuple[str, Outcome]]:
+        """Decode a string per line of `reader`, yields `(string, outcome)` in
+        the order of the lines, empty lines are skipped
+
+        The outcome is the `(human, data)` pair or the error. Up to
+        `max_pending` lines are in flight while the following lines are read,
+        an outcome is yielded as soon as it and those before it are known.
+        Leaving the loop or cancelling it cancels the lines in flight.
+        """
+        loop = asyncio.get_running_loop()
+        pending: Deque[Tuple[str, "asyncio.Future[Outcome]"]] = deque()
+        reading: Optional["asyncio.Future[bytes]"] = None
+        eof = False
+        try:
+            while not eof or pending:
+                while pending and pending[0][1].done():
+                    string, future = pending.popleft()
+                    yield string, future.result()
+
+                if not pending:
+                    # A read started while outcomes were pending is reused, a
+                    # second readline would fail while it waits
+                    if reading is None:
+                        line = await reader.readline()
+                    else:
+                        line = await reading
+                        reading = None
+                else:
+                    # Wait for the next line or the first outcome, whichever is
+                    # first, so outcomes don't wait for more input
+                    if not eof and reading is None and len(pending) < self.max_pending:
+                        reading = asyncio.ensure_future(reader.readline())
+                    waiting = [pending[0][1]]
+                    if reading is not None:
+                        waiting.append(reading)
+                    await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+                    if reading is None or not reading.done():
+                        continue
+                    line = reading.result()
+                    reading = None
+
+                if not line:
+                    eof = True
+                    continue
+
+                string = line.decode("utf-8", "replace").strip()
+                if not string:
+                    continue
+                outcome = self._check(string)
+                if outcome is None:
+                    future = asyncio.ensure_future(self._correct(string))
+                else:
+                    future = loop.create_future()
+                    future.set_result(outcome)
+                pending.append((string, future))
+        finally:
+            if reading is not None:
+                reading.cancel()
+            for _, future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        """Shut down the executor if it was started by the decoder"""
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def __aenter__(self) -> "AsyncDecoder":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,154 @@
+"""Columnar container for the outcomes of decoding millions of strings
+
+Instead of a tuple per string, the statuses, human readable parts and data of
+all rows are kept in a few contiguous buffers, about 13 bytes per row on top
+of the data itself.
+"""
+
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Union
+
+import bech32m
+from bech32m import BECH32M_MAX_LENGTH, Status
+
+# Strings decoded at once when filling the columns
+CHUNK_ROWS = 4096
+
+# Magic, version, rows, size of the human readable parts and size of the data
+HEADER = struct.Struct("<4sHQQQ")
+MAGIC = b"B32C"
+VERSION = 1
+
+
+class DecodedRow(NamedTuple):
+    """One row, `data` is a view into the data buffer of the columns"""
+
+    status: Status
+    human: str
+    data: memoryview
+
+
+class DecodedColumns:
+    """Outcomes of decoding a batch of strings, stored column by column
+
+    Row i has the status `status[i]`, the human readable part
+    `hrps[hrp_index[i]]` and the data `data[offsets[i]:offsets[i + 1]]`. Rows
+    that failed have the empty human readable part and no data. The views
+    handed out by `row` keep the data buffer from growing, so rows can't be
+    appended while any view is alive.
+    """
+
+    def __init__(self) -> None:
+        self.status = bytearray()
+        self.hrp_index = array("I")
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+        # Distinct human readable parts, the empty one of failed rows first
+        self.hrps = [""]
+        self._hrp_ids = {"": 0}
+
+    @classmethod
+    def from_strings(
+        cls,
+        strings: Iterable[Union[str, bytes]],
+        max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+        engine: str = "table",
+    ) -> "DecodedColumns":
+        """Decode strings with `bech32m.decode_many` into columns, a chunk at a
+        time, so the per-row tuples never pile up"""
+        columns = cls()
+        it = iter(strings)
+        while True:
+            chunk = [string for _, string in zip(range(CHUNK_ROWS), it)]
+            if not chunk:
+                return columns
+            for status, human, data in bech32m.decode_many(chunk, max_length, engine):
+                columns.append(status, human, data)
+
+    def append(self, status: Status, human: str, data: bytes) -> None:
+        hrp_id = self._hrp_ids.get(human)
+        if hrp_id is None:
+            hrp_id = self._hrp_ids[human] = len(self.hrps)
+            self.hrps.append(human)
+
+        self.status.append(status)
+        self.hrp_index.append(hrp_id)
+        self.data += data
+        self.offsets.append(len(self.data))
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def row(self, index: int) -> DecodedRow:
+        """Row at `index`, its data without a copy"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Row index out of range")
+
+        data = memoryview(self.data)[self.offsets[index] : self.offsets[index + 1]]
+        human = self.hrps[self.hrp_index[index]]
+        return DecodedRow(Status(self.status[index]), human, data)
+
+    def __iter__(self) -> Iterator[DecodedRow]:
+        view = memoryview(self.data)
+        hrps = self.hrps
+        offsets = self.offsets
+        for index, (status, hrp_id) in enumerate(zip(self.status, self.hrp_index)):
+            data = view[offsets[index] : offsets[index + 1]]
+            yield DecodedRow(Status(status), hrps[hrp_id], data)
+
+    def save(self, file: BinaryIO) -> None:
+        """Write the columns to a binary FILE, little-endian"""
+        hrps = "\n".join(self.hrps).encode("ascii")
+        file.write(HEADER.pack(MAGIC, VERSION, len(self), len(hrps), len(self.data)))
+        file.write(hrps)
+        file.write(self.status)
+        file.write(_little_endian(self.hrp_index))
+        file.write(_little_endian(self.offsets))
+        file.write(self.data)
+
+    @classmethod
+    def load(cls, file: BinaryIO) -> "DecodedColumns":
+        """Read columns written by `save` from a binary FILE"""
+        header = file.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise ValueError("File is too short for the header")
+        magic, version, rows, hrps_size, data_size = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a file of decoded columns")
+
+        columns = cls()
+        columns.hrps = _read(file, hrps_size).decode("ascii").split("\n")
+        columns._hrp_ids = {human: idx for idx, human in enumerate(columns.hrps)}
+        columns.status = bytearray(_read(file, rows))
+        columns.hrp_index = _read_array(file, "I", rows)
+        columns.offsets = _read_array(file, "Q", rows + 1)
+        columns.data = bytearray(_read(file, data_size))
+        if columns.offsets[-1] != data_size:
+            raise ValueError("Offsets don't match the data")
+        return columns
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read(file: BinaryIO, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("File of decoded columns is truncated")
+    return data
+
+
+def _read_array(file: BinaryIO, typecode: str, count: int) -> array:
+    values = array(typecode)
+    values.frombytes(_read(file, count * values.itemsize))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
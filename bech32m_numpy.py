@@ -0,0 +1,211 @@
+"""NumPy engine for batches of equal-length bech32m strings
+
+Strings are packed into an (N, L) matrix of bytes, so the checks, the polymod
+recurrence and the 5 <-> 8 bit repacking run column by column over all rows
+at once. The results are the same as of the scalar functions in `bech32m`.
+Needs NumPy, which the rest of the package does not.
+"""
+
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+from bech32m import (
+    BECH32M,
+    BECH32M_CHARSET,
+    BECH32M_CHECKSUM_LENGTH,
+    BECH32M_MAX_LENGTH,
+    POLYMOD_TABLE_5,
+    POLYMOD_TABLE_15,
+    Bech32mError,
+    Status,
+    check_human,
+    hrp_state,
+)
+
+_TABLE_5 = np.array(POLYMOD_TABLE_5, dtype=np.uint32)
+_TABLE_15 = np.array(POLYMOD_TABLE_15, dtype=np.uint32)
+
+# Symbol value of every byte, 0xFF for bytes outside of the charset
+_FROM_CHARSET = np.full(256, 0xFF, dtype=np.uint8)
+_FROM_CHARSET[np.frombuffer(BECH32M_CHARSET.encode(), dtype=np.uint8)] = range(32)
+_TO_CHARSET = np.frombuffer(BECH32M_CHARSET.encode(), dtype=np.uint8)
+
+# Bit offsets of the 8 symbols and 5 bytes within a 40-bit block
+_SYMBOL_SHIFTS = np.arange(35, -1, -5, dtype=np.uint64)
+_BYTE_SHIFTS = np.arange(32, -1, -8, dtype=np.uint64)
+
+
+def to_matrix(strings: Sequence[Union[str, bytes]]) -> np.ndarray:
+    """Pack equal-length strings into an (N, L) uint8 matrix
+
+    Non-ASCII characters become 0x80, which fails every later check.
+    """
+    lengths = set(map(len, strings))
+    if len(lengths) > 1:
+        raise ValueError("Strings are not of equal length")
+    length = lengths.pop() if lengths else 0
+
+    if strings and isinstance(strings[0], str):
+        text = "".join(strings)
+        if text.isascii():
+            matrix = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+        else:
+            points = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+            matrix = np.minimum(points, 0x80).astype(np.uint8)
+    else:
+        matrix = np.frombuffer(b"".join(strings), dtype=np.uint8)
+
+    return matrix.reshape(len(strings), length)
+
+
+def polymod(symbols: np.ndarray, chk: Union[int, np.ndarray] = 1) -> np.ndarray:
+    """Polymod of every row of an (N, C) matrix of symbols
+
+    Same as `bech32m.polymod`, three columns are processed per table lookup.
+    `chk` is the starting state, shared by all rows or one per row.
+    """
+    rows, columns = symbols.shape
+    chk = np.broadcast_to(np.asarray(chk, dtype=np.uint32), (rows,)).copy()
+    symbols = symbols.astype(np.uint32)
+
+    end = columns - columns % 3
+    triples = symbols[:, 0:end:3] << 10 | symbols[:, 1:end:3] << 5
+    triples |= symbols[:, 2:end:3]
+    for column in np.ascontiguousarray(triples.T):
+        chk = ((chk & 0x7FFF) << 15) ^ column ^ _TABLE_15[chk >> 15]
+
+    for column in np.ascontiguousarray(symbols[:, end:].T):
+        chk = ((chk & 0x1FFFFFF) << 5) ^ column ^ _TABLE_5[chk >> 25]
+
+    return chk
+
+
+def symbols_to_bytes(symbols: np.ndarray) -> np.ndarray:
+    """Repack an (N, C) matrix of 5-bit symbols into (N, ceil(5C / 8)) bytes
+
+    Leftover bits end up in the last column, left aligned. `bech32m.decode_data`
+    drops that incomplete byte when it is zero.
+    """
+    rows, columns = symbols.shape
+    blocks = -(-columns // 8)
+    padded = np.zeros((rows, blocks * 8), dtype=np.uint64)
+    padded[:, :columns] = symbols
+    values = np.bitwise_or.reduce(
+        padded.reshape(rows, blocks, 8) << _SYMBOL_SHIFTS, axis=2
+    )
+    data = (values[:, :, None] >> _BYTE_SHIFTS & 0xFF).astype(np.uint8)
+    return data.reshape(rows, blocks * 5)[:, : -(-columns * 5 // 8)]
+
+
+def bytes_to_symbols(data: np.ndarray) -> np.ndarray:
+    """Repack an (N, B) matrix of bytes into (N, ceil(8B / 5)) 5-bit symbols
+
+    Leftover bits end up in the last column, left aligned. `bech32m.encode_data`
+    drops that incomplete symbol when it is zero.
+    """
+    rows, columns = data.shape
+    blocks = -(-columns // 5)
+    padded = np.zeros((rows, blocks * 5), dtype=np.uint64)
+    padded[:, :columns] = data
+    values = np.bitwise_or.reduce(
+        padded.reshape(rows, blocks, 5) << _BYTE_SHIFTS, axis=2
+    )
+    symbols = (values[:, :, None] >> _SYMBOL_SHIFTS & 0x1F).astype(np.uint8)
+    return symbols.reshape(rows, blocks * 8)[:, : -(-columns * 8 // 5)]
+
+
+def decode(
+    human: str,
+    strings: Union[Sequence[Union[str, bytes]], np.ndarray],
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode equal-length strings expected to have the `human` part
+
+    `strings` may also be a matrix from `to_matrix`. Returns a boolean mask of
+    the valid rows and the (N, ceil(5D / 8)) matrix of their data, where D is
+    the number of data symbols. Invalid rows have all data zero. If 5D is not
+    a multiple of 8, the last column holds the padding byte `bech32m.decode`
+    only returns when it is not zero.
+    """
+    check_human(human)
+    human = human.lower()
+    matrix = strings if isinstance(strings, np.ndarray) else to_matrix(strings)
+
+    rows, length = matrix.shape
+    start = len(human) + len("1")
+    count = max(length - start - BECH32M_CHECKSUM_LENGTH, 0)
+    valid = np.full(rows, start + count + BECH32M_CHECKSUM_LENGTH == length)
+    if max_length is not None and length > max_length:
+        valid[:] = False
+    if not valid.any():
+        return valid, np.zeros((rows, -(-count * 5 // 8)), dtype=np.uint8)
+
+    upper = (matrix >= ord("A")) & (matrix <= ord("Z"))
+    lower = (matrix >= ord("a")) & (matrix <= ord("z"))
+    valid &= ~(upper.any(axis=1) & lower.any(axis=1))
+    matrix = matrix | upper.view(np.uint8) << 5
+
+    prefix = np.frombuffer((human + "1").encode("ascii"), dtype=np.uint8)
+    valid &= (matrix[:, :start] == prefix).all(axis=1)
+
+    symbols = _FROM_CHARSET[matrix[:, start:]]
+    valid &= (symbols != 0xFF).all(axis=1)
+    symbols &= 0x1F
+
+    valid &= polymod(symbols, hrp_state(human)) == BECH32M
+
+    data = symbols_to_bytes(symbols[:, :count])
+    data[~valid] = 0
+    return valid, data
+
+
+def encode(
+    human: str,
+    payloads: Union[Sequence[bytes], np.ndarray],
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+) -> list[str]:
+    """Encode equal-length payloads, or the rows of an (N, B) uint8 matrix,
+    into bech32m strings with the `human` part, same as `bech32m.encode`"""
+    check_human(human)
+    human = human.lower()
+    if isinstance(payloads, np.ndarray):
+        data = payloads.astype(np.uint8, copy=False)
+    else:
+        data = to_matrix(payloads)
+
+    rows, columns = data.shape
+    symbols = bytes_to_symbols(data)
+    whole = columns * 8 // 5
+    chk = polymod(symbols[:, :whole], hrp_state(human))
+
+    # A trailing symbol of padding bits is only kept if it is not zero
+    count = np.full(rows, whole)
+    if symbols.shape[1] != whole:
+        last = symbols[:, whole].astype(np.uint32)
+        kept = last != 0
+        chk = np.where(kept, polymod(symbols[:, whole:], chk), chk)
+        count += kept
+
+    prefix = human + "1"
+    longest = len(prefix) + int(count.max(initial=whole)) + BECH32M_CHECKSUM_LENGTH
+    if max_length is not None and longest > max_length:
+        raise Bech32mError(Status.TOO_LONG, (longest, max_length))
+
+    zeros = np.zeros((rows, BECH32M_CHECKSUM_LENGTH), dtype=np.uint8)
+    mod = polymod(zeros, chk) ^ BECH32M
+    checksum = mod[:, None] >> np.arange(25, -1, -5, dtype=np.uint32) & 0x1F
+
+    # The checksum goes right after the data, over the dropped padding symbol
+    width = symbols.shape[1] + BECH32M_CHECKSUM_LENGTH
+    text = np.zeros((rows, width), dtype=np.uint8)
+    text[:, : symbols.shape[1]] = _TO_CHARSET[symbols]
+    columns_at = count[:, None] + np.arange(BECH32M_CHECKSUM_LENGTH)
+    np.put_along_axis(text, columns_at, _TO_CHARSET[checksum], axis=1)
+
+    lengths = (count + BECH32M_CHECKSUM_LENGTH).tolist()
+    blob = text.tobytes()
+    return [
+        prefix + blob[row * width : row * width + length].decode("ascii")
+        for row, length in enumerate(lengths)
+    ]
@@ -0,0 +1,48 @@
+#! /bin/env python3
+"""Compare the scalar and the bit-sliced polymod on batches of addresses"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import bech32m  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 1000, 10000])
+    parser.add_argument("--payload", type=int, default=20, help="bytes per address")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    state = bech32m.hrp_state("bc")
+    print(f"{'batch':>8} {'scalar us':>10} {'sliced us':>10} {'speedup':>8}")
+    for size in args.sizes:
+        payloads = [rng.randbytes(args.payload) for _ in range(size)]
+        strings = [bech32m.encode("bc", data) for data in payloads]
+        rows = [bech32m.base32_to_bytes(string[3:]) for string in strings]
+        # Padding may make some rows longer, the sliced engine needs equal lengths
+        rows = [row for row in rows if len(row) == len(rows[0])]
+
+        def scalar_verify() -> list[bool]:
+            return [bech32m.polymod(row, state) == bech32m.BECH32M for row in rows]
+
+        scalar = min(timeit.repeat(scalar_verify, number=1, repeat=args.repeat))
+        sliced = min(
+            timeit.repeat(
+                lambda: bech32m.verify_sliced(rows, state), number=1, repeat=args.repeat
+            )
+        )
+        per_row = 1e6 / len(rows)
+        print(
+            f"{len(rows):>8} {scalar * per_row:>10.2f} {sliced * per_row:>10.2f}"
+            f" {scalar / sliced:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
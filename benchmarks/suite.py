@@ -0,0 +1,167 @@
+#! /bin/env python3
+"""Benchmarks of the core operations with a stored baseline and a regression gate
+
+Every metric is the best time per operation out of several repeats. `--save`
+records the results as a JSON baseline, `--compare` checks them against one
+and exits with 1 when a metric is slower than the baseline by more than the
+threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+from typing import Callable, Dict, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import bech32m  # noqa: E402
+
+CLI_PATH = os.path.join(os.path.dirname(__file__), "..", "cli.py")
+
+# Version of the format of the baseline file
+BASELINE_VERSION = 1
+
+# Relative slowdown of a metric that fails the comparison
+THRESHOLD = 0.25
+
+# A 32-byte payload, the size of a taproot program
+PAYLOAD = bytes(range(32))
+VALID = bech32m.encode("bc", PAYLOAD)
+# One wrong character, so decoding searches for the correction
+INVALID = VALID[:10] + ("q" if VALID[10] != "q" else "p") + VALID[11:]
+# The command line takes --data as text, 20 characters fit into a string
+CLI_TEXT = "bech32m benchmarking"
+
+
+def _decode_invalid() -> None:
+    try:
+        bech32m.decode(INVALID)
+    except bech32m.Bech32mError:
+        pass
+
+
+def _cli(*args: str) -> Callable[[], None]:
+    command = [sys.executable, CLI_PATH, *args]
+    return lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+
+def benchmarks() -> Dict[str, Tuple[Callable[[], object], int]]:
+    """Name of every metric with the measured function and calls per repeat"""
+    symbols = bech32m.base32_to_bytes(VALID[3:])
+    invalid_symbols = bech32m.base32_to_bytes(INVALID[3:])
+    state = bech32m.hrp_state("bc")
+    encoded = bech32m.encode_data(PAYLOAD)
+    return {
+        "polymod": (lambda: bech32m.polymod(symbols, state), 10000),
+        "encode": (lambda: bech32m.encode("bc", PAYLOAD), 2000),
+        "decode_valid": (lambda: bech32m.decode(VALID), 2000),
+        "decode_invalid": (_decode_invalid, 500),
+        "detect_single_error": (
+            lambda: bech32m.detect_single_error("bc", invalid_symbols),
+            2000,
+        ),
+        "encode_data": (lambda: bech32m.encode_data(PAYLOAD), 5000),
+        "decode_data": (lambda: bech32m.decode_data(encoded), 5000),
+        "cli_encode": (_cli("--data", CLI_TEXT), 1),
+        "cli_decode": (_cli("-d", "--data", VALID), 1),
+    }
+
+
+def measure(function: Callable[[], object], number: int, repeat: int) -> float:
+    """Best time of one call in seconds"""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def run(names: list[str], repeat: int, scale: float = 1.0) -> Dict[str, float]:
+    """Measure the named metrics, `scale` shrinks the calls per repeat"""
+    suite = benchmarks()
+    results = {}
+    for name in names:
+        function, number = suite[name]
+        results[name] = measure(function, max(int(number * scale), 1), repeat)
+    return results
+
+
+def compare(
+    baseline: Dict[str, float], results: Dict[str, float], threshold: float
+) -> list[str]:
+    """Names of the metrics slower than the baseline by more than `threshold`
+
+    Metrics missing from either side are not compared.
+    """
+    return [
+        name
+        for name, seconds in results.items()
+        if name in baseline and seconds > baseline[name] * (1 + threshold)
+    ]
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    with open(path, "r") as file:
+        baseline = json.load(file)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"Unsupported baseline version in {path}")
+    return baseline["metrics"]
+
+
+def save_baseline(path: str, results: Dict[str, float]) -> None:
+    baseline = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "metrics": results,
+    }
+    with open(path, "w") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--only", nargs="+", choices=list(benchmarks()), help="Metrics to measure"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Make 10 times fewer calls per repeat, for smoke tests",
+    )
+    parser.add_argument("--save", metavar="PATH", help="Write results as a baseline")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="Fail on regressions against a baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help="Allowed relative slowdown against the baseline, 0.25 is 25 percent",
+    )
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.compare) if args.compare else {}
+    names = args.only or list(benchmarks())
+    results = run(names, args.repeat, 0.1 if args.quick else 1.0)
+    regressed = compare(baseline, results, args.threshold)
+
+    print(f"{'metric':<20} {'us/op':>10} {'baseline':>10} {'change':>8}")
+    for name, seconds in results.items():
+        line = f"{name:<20} {seconds * 1e6:>10.2f}"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f" {baseline[name] * 1e6:>10.2f} {change:>+8.1%}"
+            if name in regressed:
+                line += "  REGRESSED"
+        print(line)
+
+    if args.save:
+        save_baseline(args.save, results)
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
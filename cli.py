@@ -4,10 +4,42 @@ import argparse
 from io import BufferedReader
 import sys
 import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from enum import Enum
 import base64
-from typing import IO, Any
+import functools
+import itertools
+import json
+import mmap
+import socket
+import socketserver
+import shutil
+import signal
+import stat
+import tempfile
+import threading
+from typing import IO, Any, Callable, Deque, Iterable, Iterator, Optional, Tuple
 import bech32m
+import multipart
+
+# Size of the pieces read from the input in the long mode
+CHUNK_SIZE = 1 << 16
+
+# Base64 output is written in lines encoding this many bytes
+BASE64_LINE_BYTES = 57
+
+# Lines processed and written together in the batch mode
+BATCH_LINES = 1024
+
+# Batches queued for every worker process, bounds the buffered results
+BATCHES_PER_JOB = 4
+
+# Size of the byte ranges an input file is split into in the batch mode
+RANGE_BYTES = 1 << 20
+
+# The daemon listens on a Unix socket, which not every platform has
+UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
 
 
 class DataFormat(Enum):
@@ -32,6 +64,46 @@ def read_bytes(file: BufferedReader, form: DataFormat) -> bytes:
         raise ValueError("Invalid format of input data.")
 
 
+def iter_bytes(
+    file: BufferedReader, form: DataFormat, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Read data bytes in some DataFormat from a FILE chunk by chunk"""
+    # Hex and base64 are decoded in groups of whole bytes
+    group = 2 if form == DataFormat.HEX else 4
+    leftover = b""
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            if form == DataFormat.BINARY:
+                yield chunk
+                continue
+
+            chunk = leftover + b"".join(chunk.split())
+            split = len(chunk) - len(chunk) % group
+            chunk, leftover = chunk[:split], chunk[split:]
+            if form == DataFormat.HEX:
+                yield bytes.fromhex(chunk.decode("utf-8"))
+            else:
+                yield base64.decodebytes(chunk)
+
+        if leftover:
+            raise ValueError()
+    # Output more understandable exception if error occured during encoding
+    except ValueError:
+        raise ValueError("Invalid format of input data.")
+
+
+def iter_text(file: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Read text from a FILE chunk by chunk, without any whitespace"""
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        yield "".join(chunk.split())
+
+
 def write_bytes(file: IO[Any], data: bytes, form: DataFormat) -> None:
     """Write data bytes in some DataFormat to a FILE"""
     if form == DataFormat.HEX:
@@ -42,6 +114,602 @@ def write_bytes(file: IO[Any], data: bytes, form: DataFormat) -> None:
         file.write(base64.encodebytes(data))
 
 
+def write_stream(file: IO[Any], chunks: Iterable[bytes], form: DataFormat) -> None:
+    """Write data bytes arriving in chunks in some DataFormat to a FILE,
+    the output is the same as `write_bytes` of all the chunks joined"""
+    if form != DataFormat.BASE64:
+        for chunk in chunks:
+            write_bytes(file, chunk, form)
+        return
+
+    # Base64 has to be written in whole lines to match the one-shot output
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        split = len(pending) - len(pending) % BASE64_LINE_BYTES
+        if split:
+            write_bytes(file, pending[:split], form)
+            pending = pending[split:]
+    if pending:
+        write_bytes(file, pending, form)
+
+
+def open_input(path: Optional[str], mode: str) -> IO[Any]:
+    """Open the input FILE, stdin if no path is given"""
+    return open(path, mode) if path else os.fdopen(sys.stdin.fileno(), mode)
+
+
+def open_output(path: Optional[str], mode: str) -> IO[Any]:
+    """Open the output FILE, stdout if no path is given"""
+    return (
+        open(path, mode)
+        if path
+        else os.fdopen(sys.stdout.fileno(), mode, closefd=False)
+    )
+
+
+def encode_stream(
+    infile: BufferedReader,
+    outfile: IO[str],
+    human: str,
+    form: DataFormat,
+    max_length: Optional[int],
+) -> None:
+    """Encode the whole input FILE into one long bech32m string chunk by chunk
+
+    The string is written as it is encoded only when the size of a regular
+    binary input file shows that it fits into `max_length`. Otherwise it goes
+    to a temporary file first and is copied to the output FILE once complete,
+    so nothing is written when the string turns out too long.
+    """
+    encoder = bech32m.StreamEncoder(human, max_length)
+    fits = max_length is None
+    if form == DataFormat.BINARY and stat.S_ISREG(os.fstat(infile.fileno()).st_mode):
+        size = os.fstat(infile.fileno()).st_size
+        overhead = len(human) + len("1") + bech32m.BECH32M_CHECKSUM_LENGTH
+        # A padding symbol is only added for some inputs, so this is the least
+        shortest = overhead + size * 8 // 5
+        if max_length is not None and shortest > max_length:
+            raise bech32m.Bech32mError(
+                bech32m.Status.TOO_LONG, (shortest, max_length)
+            )
+        fits = max_length is None or overhead + -(-size * 8 // 5) <= max_length
+
+    if fits:
+        for chunk in iter_bytes(infile, form):
+            outfile.write(encoder.feed(chunk))
+        print(encoder.finish(), file=outfile)
+        return
+
+    with tempfile.TemporaryFile("w+") as spool:
+        for chunk in iter_bytes(infile, form):
+            spool.write(encoder.feed(chunk))
+        print(encoder.finish(), file=spool)
+        spool.seek(0)
+        shutil.copyfileobj(spool, outfile, CHUNK_SIZE)
+
+
+def decode_stream(
+    infile: IO[str], outfile: IO[bytes], form: DataFormat, max_length: Optional[int]
+) -> None:
+    """Decode one long bech32m string from the input FILE chunk by chunk
+
+    The checksum is only known to be valid at the end, so the output goes to
+    a temporary file first and is copied to the output FILE once verified.
+    Nothing is written when decoding fails.
+    """
+    decoder = bech32m.StreamDecoder(max_length)
+
+    def chunks() -> Iterator[bytes]:
+        for text in iter_text(infile):
+            yield decoder.feed(text)
+        yield decoder.finish()
+
+    with tempfile.TemporaryFile() as spool:
+        write_stream(spool, chunks(), form)
+        spool.seek(0)
+        shutil.copyfileobj(spool, outfile, CHUNK_SIZE)
+
+
+def sized_chunks(
+    infile: BufferedReader, form: DataFormat
+) -> Tuple[Iterable[bytes], int]:
+    """Data bytes of the input FILE in chunks together with their total size
+
+    The size of regular binary files is known upfront, any other input is
+    decoded into a temporary file first, so it is never held in memory.
+    """
+    if form == DataFormat.BINARY and stat.S_ISREG(os.fstat(infile.fileno()).st_mode):
+        return iter_bytes(infile, form), os.fstat(infile.fileno()).st_size
+
+    spool = tempfile.TemporaryFile()
+    for chunk in iter_bytes(infile, form):
+        spool.write(chunk)
+    size = spool.tell()
+    spool.seek(0)
+    return iter_bytes(spool, DataFormat.BINARY), size
+
+
+def encode_parts_stream(
+    chunks: Iterable[bytes],
+    size: int,
+    outfile: IO[str],
+    human: str,
+    max_length: Optional[int],
+) -> None:
+    """Encode the data into a multi-part container, one part per line"""
+    for part in multipart.encode_parts(human, chunks, size, max_length):
+        print(part, file=outfile)
+
+
+def decode_parts_stream(
+    lines: Iterable[str],
+    outfile: IO[bytes],
+    form: DataFormat,
+    in_place: bool,
+    max_length: Optional[int],
+    max_size: Optional[int] = None,
+) -> None:
+    """Decode a multi-part container given one part per line, in any order
+
+    With `in_place` binary output every part is written at its place in the
+    file right away, the caller removes the file if decoding fails. Otherwise
+    the data go to a temporary file first and are copied to the output FILE
+    once all parts arrived, so nothing is written when decoding fails. Every
+    part is limited to `max_length`, data of more than `max_size` bytes are
+    rejected.
+    """
+    parts = (line.strip() for line in lines if line.strip())
+    if in_place and form == DataFormat.BINARY:
+        multipart.decode_parts_into(parts, outfile, max_length, max_size)
+        return
+
+    with tempfile.TemporaryFile() as spool:
+        write_stream(spool, multipart.decode_parts(parts, max_length, max_size), form)
+        spool.seek(0)
+        shutil.copyfileobj(spool, outfile, CHUNK_SIZE)
+
+
+def parse_line(line: str, form: DataFormat) -> bytes:
+    """Data bytes of one line of text in hex or base64"""
+    if form == DataFormat.HEX:
+        return bytes.fromhex(line)
+    return base64.b64decode(line, validate=True)
+
+
+def format_line(data: bytes, form: DataFormat) -> str:
+    """One line of text with data bytes in hex or base64"""
+    if form == DataFormat.HEX:
+        return data.hex()
+    return base64.b64encode(data).decode("ascii")
+
+
+def encode_batch(
+    lines: list[str],
+    human: str,
+    form: DataFormat,
+    max_length: Optional[int],
+    backend: Any = bech32m,
+) -> list[str]:
+    """Encode a batch of lines with data, one `STATUS\tstring` line for each,
+    the `backend` is anything with the batch API of `bech32m`"""
+    payloads = []
+    parsed = []
+    for line in lines:
+        try:
+            payloads.append(parse_line(line, form))
+            parsed.append(True)
+        except ValueError:
+            parsed.append(False)
+
+    results = iter(backend.encode_many(human, payloads, max_length))
+    output = []
+    for ok in parsed:
+        if not ok:
+            output.append("INVALID_FORMAT\t\n")
+            continue
+        status, string = next(results)
+        output.append(f"{status.name}\t{string}\n")
+    return output
+
+
+def decode_batch(
+    lines: list[str],
+    form: DataFormat,
+    max_length: Optional[int],
+    backend: Any = bech32m,
+) -> list[str]:
+    """Decode a batch of bech32m strings, one `STATUS\tdata` line for each"""
+    output = []
+    for status, _, data in backend.decode_many(lines, max_length):
+        result = format_line(data, form) if status == bech32m.Status.OK else ""
+        output.append(f"{status.name}\t{result}\n")
+    return output
+
+
+def process_batch(
+    batch: list[str],
+    to_encode: bool,
+    human: str,
+    form: DataFormat,
+    max_length: Optional[int],
+    backend: Any = None,
+) -> Tuple[str, int]:
+    """Output of a batch of lines and the number of lines that failed"""
+    # Modules can't be pickled, so the default is resolved in the worker
+    backend = backend or bech32m
+    if to_encode:
+        output = encode_batch(batch, human, form, max_length, backend)
+    else:
+        output = decode_batch(batch, form, max_length, backend)
+    failures = sum(1 for line in output if not line.startswith("OK\t"))
+    return "".join(output), failures
+
+
+def iter_batches(lines: Iterable[str]) -> Iterator[list[str]]:
+    """Stripped lines in batches of `BATCH_LINES`, read lazily"""
+    stripped = (line.strip() for line in lines)
+    while True:
+        batch = list(itertools.islice(stripped, BATCH_LINES))
+        if not batch:
+            return
+        yield batch
+
+
+def ordered_map(
+    function: Callable[[Any], Any], items: Iterable[Any], jobs: int
+) -> Iterator[Any]:
+    """Map `function` over `items` on `jobs` worker processes, in input order
+
+    At most `BATCHES_PER_JOB` items per worker are in flight, so a slow item
+    holds back the reading of the input rather than letting finished results
+    pile up behind it.
+    """
+    if jobs == 1:
+        yield from map(function, items)
+        return
+
+    with ProcessPoolExecutor(jobs) as pool:
+        in_flight: Deque[Future] = deque()
+        for item in items:
+            in_flight.append(pool.submit(function, item))
+            if len(in_flight) >= jobs * BATCHES_PER_JOB:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def run_batch(
+    lines: Iterable[str],
+    outfile: IO[str],
+    to_encode: bool,
+    human: str,
+    form: DataFormat,
+    max_length: Optional[int],
+    jobs: int = 1,
+    backend: Any = None,
+) -> int:
+    """Encode or decode newline-delimited inputs, returns the number of failures
+
+    Lines are read lazily and processed `BATCH_LINES` at a time, on `jobs`
+    processes, the output of every batch is written at once and in the input
+    order. A line that fails gets its status in the first column and an empty
+    result, the rest of the input is still processed. A `DaemonClient` as the
+    `backend` leaves the work to a daemon, with a single job.
+    """
+    work = functools.partial(
+        process_batch,
+        to_encode=to_encode,
+        human=human,
+        form=form,
+        max_length=max_length,
+        backend=backend,
+    )
+    failures = 0
+    for output, failed in ordered_map(work, iter_batches(lines), jobs):
+        failures += failed
+        outfile.write(output)
+    return failures
+
+
+def split_ranges(path: str, range_bytes: int = RANGE_BYTES) -> list[Tuple[int, int]]:
+    """Split a file into `(start, end)` byte ranges of about `range_bytes`,
+    every range ends right after a newline or at the end of the file"""
+    size = os.path.getsize(path)
+    if not size:
+        return []
+
+    ranges = []
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            start = 0
+            while start < size:
+                end = mapped.find(b"\n", min(start + range_bytes, size) - 1)
+                end = size if end < 0 else end + 1
+                ranges.append((start, end))
+                start = end
+    return ranges
+
+
+def iter_records(mapped: mmap.mmap, start: int, end: int) -> Iterator[memoryview]:
+    """Lines between `start` and `end` of a memory-mapped file as zero-copy
+    slices, without the surrounding whitespace"""
+    view = memoryview(mapped)
+    whitespace = b" \t\n\r\x0b\x0c"
+    while start < end:
+        stop = mapped.find(b"\n", start, end)
+        if stop < 0:
+            stop = end
+        first, last = start, stop
+        while first < last and mapped[first] in whitespace:
+            first += 1
+        while last > first and mapped[last - 1] in whitespace:
+            last -= 1
+        yield view[first:last]
+        start = stop + 1
+
+
+def process_range(
+    path: str,
+    file_range: Tuple[int, int],
+    to_encode: bool,
+    human: str,
+    form: DataFormat,
+    max_length: Optional[int],
+) -> Tuple[str, int]:
+    """Output of the lines in a byte range of a file and the number of lines
+    that failed, the file is memory-mapped, so only the range is read"""
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # The slices have to be gone before the map is closed
+            return _process_records(
+                iter_records(mapped, *file_range), to_encode, human, form, max_length
+            )
+
+
+def _process_records(
+    records: Iterator[memoryview],
+    to_encode: bool,
+    human: str,
+    form: DataFormat,
+    max_length: Optional[int],
+) -> Tuple[str, int]:
+    outputs = []
+    failures = 0
+    while True:
+        batch: list[Any] = list(itertools.islice(records, BATCH_LINES))
+        if not batch:
+            return "".join(outputs), failures
+
+        if to_encode:
+            batch = [str(record, "latin-1") for record in batch]
+        output, failed = process_batch(batch, to_encode, human, form, max_length)
+        outputs.append(output)
+        failures += failed
+
+
+def run_batch_file(
+    path: str,
+    outfile: IO[str],
+    to_encode: bool,
+    human: str,
+    form: DataFormat,
+    max_length: Optional[int],
+    jobs: int = 1,
+) -> int:
+    """Same as `run_batch` on the lines of a regular file, which is
+    memory-mapped and split into byte ranges, one job each, so files larger
+    than memory are processed without reading them into it"""
+    work = functools.partial(
+        process_range,
+        path,
+        to_encode=to_encode,
+        human=human,
+        form=form,
+        max_length=max_length,
+    )
+    failures = 0
+    for output, failed in ordered_map(work, split_ranges(path), jobs):
+        failures += failed
+        outfile.write(output)
+    return failures
+
+
+def _string_list(request: dict, key: str) -> list[str]:
+    """Member `key` of a request, checked to be a list of strings"""
+    items = request[key]
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        raise ValueError(f"{key} has to be a list of strings")
+    return items
+
+
+def handle_request(request: Any) -> dict:
+    """Answer one request of the daemon protocol
+
+    Requests are JSON objects, `{"op": "decode", "strings": [...]}` or
+    `{"op": "encode", "hrp": ..., "data": [hex, ...]}`, optionally with
+    `max_length`. The answer has a `results` list, every result has the name
+    of its `Status` and on success `hrp` and hex `data`, or the `string`.
+    Data that isn't hex get the INVALID_FORMAT status, as in the batch mode.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Request has to be a JSON object")
+
+    op = request.get("op")
+    max_length = request.get("max_length", bech32m.BECH32M_MAX_LENGTH)
+    if max_length is not None and (
+        not isinstance(max_length, int) or isinstance(max_length, bool)
+    ):
+        raise ValueError("max_length has to be an integer or null")
+
+    results: list[dict] = []
+    if op == "decode":
+        strings = _string_list(request, "strings")
+        for status, human, data in bech32m.decode_many(strings, max_length):
+            result = {"status": status.name}
+            if status == bech32m.Status.OK:
+                result.update(hrp=human, data=data.hex())
+            results.append(result)
+    elif op == "encode":
+        if not isinstance(request["hrp"], str):
+            raise ValueError("hrp has to be a string")
+        payloads = []
+        parsed = []
+        for item in _string_list(request, "data"):
+            try:
+                payloads.append(bytes.fromhex(item))
+                parsed.append(True)
+            except ValueError:
+                parsed.append(False)
+
+        encoded = iter(bech32m.encode_many(request["hrp"], payloads, max_length))
+        for ok in parsed:
+            if not ok:
+                results.append({"status": "INVALID_FORMAT"})
+                continue
+            status, string = next(encoded)
+            result = {"status": status.name}
+            if status == bech32m.Status.OK:
+                result.update(string=string)
+            results.append(result)
+    else:
+        raise ValueError(f"Unknown op {op!r}")
+
+    return {"results": results}
+
+
+def answer(line: bytes) -> bytes:
+    """Response line to a request line, errors are answered with `error`,
+    an `id` of the request is copied to the response"""
+    request = None
+    try:
+        request = json.loads(line)
+        response = handle_request(request)
+    except KeyError as ex:
+        response = {"error": f"Request is missing {ex}"}
+    except (ValueError, TypeError) as ex:
+        response = {"error": str(ex)}
+
+    if isinstance(request, dict) and "id" in request:
+        response["id"] = request["id"]
+    return json.dumps(response).encode("utf-8") + b"\n"
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    """Answers the requests of one connection, one JSON object per line"""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(answer(line))
+
+
+def make_server(path: str) -> "socketserver.ThreadingUnixStreamServer":
+    """Daemon listening on the Unix socket `path`, a stale socket is replaced"""
+    if not UNIX_SOCKETS:
+        raise ValueError("Unix sockets are not supported on this platform")
+    if os.path.lexists(path):
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            raise ValueError(f"{path} exists and is not a socket")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+        else:
+            raise ValueError(f"A daemon is already listening on {path}")
+        finally:
+            probe.close()
+
+    server = socketserver.ThreadingUnixStreamServer(path, DaemonHandler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(path: str) -> None:
+    """Run the daemon until interrupted or terminated, the socket is removed
+    either way"""
+    with make_server(path) as server:
+
+        def terminate(signum: int, frame: Any) -> None:
+            # shutdown() waits for serve_forever() to return, which runs here
+            threading.Thread(target=server.shutdown).start()
+
+        previous = signal.signal(signal.SIGTERM, terminate)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            os.unlink(path)
+
+
+class DaemonClient:
+    """Thin client of the daemon with the batch API of `bech32m`
+
+    Requests are sent one at a time over one connection, each waits for its
+    answer. Errors answered by the daemon are raised as ValueError.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+        self._file = self._socket.makefile("rwb")
+
+    def request(self, request: dict) -> dict:
+        self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the connection")
+
+        response = json.loads(line)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+    def decode_many(
+        self,
+        strings: Iterable[str],
+        max_length: Optional[int] = bech32m.BECH32M_MAX_LENGTH,
+    ) -> list[bech32m.DecodeResult]:
+        request = {"op": "decode", "strings": list(strings), "max_length": max_length}
+        return [
+            bech32m.DecodeResult(
+                bech32m.Status[result["status"]],
+                result.get("hrp", ""),
+                bytes.fromhex(result.get("data", "")),
+            )
+            for result in self.request(request)["results"]
+        ]
+
+    def encode_many(
+        self,
+        human: str,
+        payloads: Iterable[bytes],
+        max_length: Optional[int] = bech32m.BECH32M_MAX_LENGTH,
+    ) -> list[bech32m.EncodeResult]:
+        data = [payload.hex() for payload in payloads]
+        request = {"op": "encode", "hrp": human, "data": data, "max_length": max_length}
+        return [
+            bech32m.EncodeResult(
+                bech32m.Status[result["status"]], result.get("string", "")
+            )
+            for result in self.request(request)["results"]
+        ]
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Bech32m encoder/decoder of arbitrary input"
@@ -101,6 +769,51 @@ if __name__ == "__main__":
         type=str,
         help="option to pass text data as an argument instead of using file or stdin. If the data is used for encoding, the text is encoded using utf-8.",
     )
+    parser.add_argument(
+        "--max-length",
+        action="store",
+        type=int,
+        default=bech32m.BECH32M_MAX_LENGTH,
+        help="maximum length of the bech32m string, 0 for no limit. Default is 90. With a different limit the input is processed in chunks as it is read.",
+    )
+    parser.add_argument(
+        "--parts",
+        action="store_true",
+        help="encode data of any size into a multi-part container, one bech32m string per line, or decode it from parts in any order. --max-length limits every part.",
+    )
+    parser.add_argument(
+        "--max-size",
+        action="store",
+        type=int,
+        metavar="BYTES",
+        help="when decoding --parts, reject a container of more than BYTES bytes of data. By default the size is not limited.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="encode or decode every input line on its own, data in hex or base64. Every output line starts with a status column, OK or the reason of the failure, the run goes on after failures.",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store",
+        type=str,
+        metavar="SOCKET",
+        help="run as a daemon answering JSON requests, one per line, on the Unix socket SOCKET. Saves the interpreter startup for every call.",
+    )
+    parser.add_argument(
+        "--socket",
+        action="store",
+        type=str,
+        help="in the --batch mode, leave the encoding or decoding to the daemon listening on the Unix socket SOCKET.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        action="store",
+        type=int,
+        default=1,
+        help="number of worker processes in the --batch mode, 0 for one per CPU. Output stays in the input order. Default is 1.",
+    )
 
     args = parser.parse_args()
 
@@ -120,6 +833,119 @@ if __name__ == "__main__":
 
     input_data = args.data
 
+    # Long mode streams the input, so it never has to be in memory as a whole
+    long_mode = args.max_length != bech32m.BECH32M_MAX_LENGTH
+    max_length = args.max_length or None
+
+    # Result is text string if we are encoding
+    OUTFLAGS = "w" if to_encode else "wb"
+
+    if (args.serve or args.socket) and not UNIX_SOCKETS:
+        parser.error("--serve and --socket need Unix sockets")
+    if args.serve:
+        serve(args.serve)
+        sys.exit(0)
+
+    if args.jobs != 1 and not args.batch:
+        parser.error("--jobs needs --batch")
+    if args.socket and (not args.batch or args.jobs != 1):
+        parser.error("--socket needs --batch and works without --jobs")
+
+    if args.batch:
+        form = inform if to_encode else outform
+        if args.parts or form == DataFormat.BINARY:
+            parser.error("--batch works with hex or base64 data and without --parts")
+        jobs = args.jobs or os.cpu_count() or 1
+        if jobs < 0:
+            parser.error("--jobs can't be negative")
+
+        if args.socket:
+            with open_input(args.input_path, "r") as infile:
+                with open_output(args.output_path, "w") as outfile:
+                    with DaemonClient(args.socket) as client:
+                        lines = args.data.splitlines() if args.data else infile
+                        failures = run_batch(
+                            lines,
+                            outfile,
+                            to_encode,
+                            args.human_part,
+                            form,
+                            max_length,
+                            backend=client,
+                        )
+            sys.exit(1 if failures else 0)
+
+        if args.input_path and os.path.isfile(args.input_path):
+            with open_output(args.output_path, "w") as outfile:
+                failures = run_batch_file(
+                    args.input_path,
+                    outfile,
+                    to_encode,
+                    args.human_part,
+                    form,
+                    max_length,
+                    jobs,
+                )
+            sys.exit(1 if failures else 0)
+
+        with open_input(args.input_path, "r") as infile:
+            with open_output(args.output_path, "w") as outfile:
+                lines = args.data.splitlines() if args.data else infile
+                failures = run_batch(
+                    lines, outfile, to_encode, args.human_part, form, max_length, jobs
+                )
+        sys.exit(1 if failures else 0)
+
+    if args.parts:
+        try:
+            with open_output(args.output_path, OUTFLAGS) as outfile:
+                if to_encode and args.data:
+                    data = args.data.encode("utf8")
+                    encode_parts_stream(
+                        [data], len(data), outfile, args.human_part, max_length
+                    )
+                elif to_encode:
+                    with open_input(args.input_path, "rb") as infile:
+                        chunks, size = sized_chunks(infile, inform)
+                        encode_parts_stream(
+                            chunks, size, outfile, args.human_part, max_length
+                        )
+                else:
+                    with open_input(args.input_path, "r") as infile:
+                        lines = args.data.splitlines() if args.data else infile
+                        in_place = args.output_path is not None
+                        decode_parts_stream(
+                            lines,
+                            outfile,
+                            outform,
+                            in_place,
+                            max_length,
+                            args.max_size,
+                        )
+        except ValueError:
+            # A failed run doesn't leave partial output behind
+            if args.output_path:
+                os.unlink(args.output_path)
+            raise
+        sys.exit(0)
+
+    if long_mode and not args.data:
+        try:
+            with open_input(args.input_path, "rb" if to_encode else "r") as infile:
+                with open_output(args.output_path, OUTFLAGS) as outfile:
+                    if to_encode:
+                        encode_stream(
+                            infile, outfile, args.human_part, inform, max_length
+                        )
+                    else:
+                        decode_stream(infile, outfile, outform, max_length)
+        except ValueError:
+            # A failed run doesn't leave partial output behind
+            if args.output_path:
+                os.unlink(args.output_path)
+            raise
+        sys.exit(0)
+
     # Prefer data argument over default stdin
     if args.data and to_encode:
         input_data = input_data.encode("utf8")
@@ -142,12 +968,9 @@ if __name__ == "__main__":
     result = bytes()
 
     if to_encode:
-        result = bech32m.encode(args.human_part, input_data)
+        result = bech32m.encode(args.human_part, input_data, max_length)
     else:
-        result = bech32m.decode(input_data)[1]
-
-    # Result is text string if we are encoding
-    OUTFLAGS = "w" if to_encode else "wb"
+        result = bech32m.decode(input_data, max_length=max_length)[1]
 
     with open(args.output_path, OUTFLAGS) if args.output_path else os.fdopen(
         sys.stdout.fileno(), OUTFLAGS, closefd=False
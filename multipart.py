@@ -0,0 +1,231 @@
+import bisect
+import struct
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple, Union
+
+import bech32m
+
+# Part index, total number of parts and length of the payload in the part
+HEADER = struct.Struct(">IIH")
+
+# Payloads are kept in whole 5-byte groups, which are exactly 8 symbols,
+# so no padding bits are ever needed
+BLOCK_SIZE = 5
+
+
+def part_capacity(
+    human: str, max_length: Union[int, None] = bech32m.BECH32M_MAX_LENGTH
+) -> int:
+    """Number of data bytes carried by one part"""
+    if max_length is None:
+        max_length = bech32m.BECH32M_LONG_MAX_LENGTH
+
+    symbols = max_length - len(human) - len("1") - bech32m.BECH32M_CHECKSUM_LENGTH
+    capacity = (symbols * 5 // 8 - HEADER.size) // BLOCK_SIZE * BLOCK_SIZE
+    # The payload length has to fit into the header
+    capacity = min(capacity, 0xFFFF // BLOCK_SIZE * BLOCK_SIZE)
+    if capacity <= 0:
+        raise ValueError(f"No room for data in parts of length {max_length}")
+
+    return capacity
+
+
+def encode_part(
+    human: str,
+    index: int,
+    total: int,
+    payload: bytes,
+    max_length: Union[int, None] = bech32m.BECH32M_MAX_LENGTH,
+) -> str:
+    """Encode one part of a multi-part container"""
+    padding = bytes(-len(payload) % BLOCK_SIZE)
+    data = HEADER.pack(index, total, len(payload)) + payload + padding
+    return bech32m.encode(human, data, max_length)
+
+
+def encode_parts(
+    human: str,
+    chunks: Iterable[bytes],
+    size: int,
+    max_length: Union[int, None] = bech32m.BECH32M_MAX_LENGTH,
+) -> Iterator[str]:
+    """Split `size` bytes of data arriving in chunks into checksummed parts
+
+    Every part is a bech32m string of at most `max_length` characters, its data
+    start with the part index, total number of parts and payload length. The
+    total has to be known upfront, hence the `size`. Only one part is held in
+    memory at a time.
+    """
+    capacity = part_capacity(human, max_length)
+    total = max(1, -(-size // capacity))
+    if total > 0xFFFFFFFF:
+        raise ValueError(f"Data of {size} bytes need too many parts")
+
+    index = 0
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        start = 0
+        while len(pending) - start >= capacity and index < total - 1:
+            part = pending[start : start + capacity]
+            yield encode_part(human, index, total, part, max_length)
+            start += capacity
+            index += 1
+        pending = pending[start:]
+
+    if index != total - 1 or len(pending) != size - index * capacity:
+        raise ValueError(f"Data are not {size} bytes long")
+
+    yield encode_part(human, index, total, pending, max_length)
+
+
+class PartsDecoder:
+    """Decode the parts of a multi-part container in any order
+
+    `add` returns the payloads with their offsets in the data. All parts but
+    the last one carry the same amount of data, so the last part is held back
+    until that amount is known from some other part. The received parts are
+    kept as runs of consecutive indices, so memory grows with how scattered
+    they are and not with the total claimed by a header. With `max_size`,
+    parts placed past that many bytes are rejected.
+    """
+
+    def __init__(
+        self,
+        max_length: Union[int, None] = bech32m.BECH32M_LONG_MAX_LENGTH,
+        max_size: Union[int, None] = None,
+    ) -> None:
+        self.human: Union[str, None] = None
+        self.total: Union[int, None] = None
+        self.size: Union[int, None] = None
+        self._max_length = max_length
+        self._max_size = max_size
+        self._part_size: Union[int, None] = None
+        self._last: Union[bytes, None] = None
+        # Runs of received part indices, `_starts[i]` up to `_ends[i]` excluded
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._count = 0
+
+    def add(self, string: str) -> List[Tuple[int, bytes]]:
+        """Decode one part, returns the `(offset, payload)` pairs now placed"""
+        human, data = bech32m.decode(
+            string, correct=False, max_length=self._max_length
+        )
+        if len(data) < HEADER.size:
+            raise ValueError("Part is missing the header")
+
+        index, total, length = HEADER.unpack_from(data)
+        payload = data[HEADER.size : HEADER.size + length]
+        if len(payload) != length:
+            raise ValueError(f"Part {index} is shorter than its header says")
+
+        if self.total is None:
+            self.human = human
+            self.total = total
+        elif human != self.human or total != self.total:
+            raise ValueError(f"Part {index} belongs to a different container")
+
+        if index >= total:
+            raise ValueError(f"Part index {index} is out of range")
+        run = bisect.bisect_right(self._starts, index)
+        if run > 0 and self._ends[run - 1] > index:
+            raise ValueError(f"Part {index} is duplicated")
+
+        placed = []
+        if index != total - 1:
+            if self._part_size is not None and length != self._part_size:
+                raise ValueError(f"Part {index} has a different length")
+            # The other parts end before the last one starts
+            self._check_size((total - 1) * length)
+            self._part_size = length
+            placed.append((index * length, payload))
+        else:
+            self._last = payload
+
+        # The last part can be placed once the length of the others is known
+        if self._last is not None and (self._part_size is not None or total == 1):
+            offset = (total - 1) * (self._part_size or 0)
+            self._check_size(offset + len(self._last))
+            self.size = offset + len(self._last)
+            placed.append((offset, self._last))
+            self._last = None
+
+        self._receive(run, index)
+        return placed
+
+    def _receive(self, run: int, index: int) -> None:
+        """Add `index` to the runs, `run` is the first run starting after it"""
+        joins_left = run > 0 and self._ends[run - 1] == index
+        joins_right = run < len(self._starts) and self._starts[run] == index + 1
+        if joins_left and joins_right:
+            self._ends[run - 1] = self._ends.pop(run)
+            del self._starts[run]
+        elif joins_left:
+            self._ends[run - 1] = index + 1
+        elif joins_right:
+            self._starts[run] = index
+        else:
+            self._starts.insert(run, index)
+            self._ends.insert(run, index + 1)
+        self._count += 1
+
+    def _check_size(self, size: int) -> None:
+        if self._max_size is not None and size > self._max_size:
+            raise ValueError(f"Data exceed the maximum size of {self._max_size} bytes")
+
+    def finish(self) -> int:
+        """Check that all parts arrived, returns the size of the data"""
+        if self.total is None or self._count != self.total:
+            missing = (self.total or 1) - self._count
+            raise ValueError(f"Missing {missing} part(s)")
+        return self.size
+
+
+def decode_parts(
+    strings: Iterable[str],
+    max_length: Union[int, None] = bech32m.BECH32M_LONG_MAX_LENGTH,
+    max_size: Union[int, None] = None,
+) -> Iterator[bytes]:
+    """Reassemble data from parts arriving in any order, in order
+
+    Parts that arrive early are buffered until the data before them are out,
+    so memory use only grows with how much the parts are out of order. Data
+    longer than `max_size` bytes raise ValueError.
+    """
+    decoder = PartsDecoder(max_length, max_size)
+    pending: Dict[int, bytes] = {}
+    written = 0
+
+    for string in strings:
+        for offset, payload in decoder.add(string):
+            pending[offset] = payload
+        while written in pending:
+            payload = pending.pop(written)
+            written += len(payload)
+            yield payload
+
+    decoder.finish()
+
+
+def decode_parts_into(
+    strings: Iterable[str],
+    file: BinaryIO,
+    max_length: Union[int, None] = bech32m.BECH32M_LONG_MAX_LENGTH,
+    max_size: Union[int, None] = None,
+) -> int:
+    """Reassemble data from parts arriving in any order into a seekable FILE
+
+    Every payload is written straight to its offset, so memory use stays
+    constant whatever the order. Parts are never written past `max_size`
+    bytes, data longer than that raise ValueError. Returns the size of the
+    data.
+    """
+    decoder = PartsDecoder(max_length, max_size)
+    for string in strings:
+        for offset, payload in decoder.add(string):
+            file.seek(offset)
+            file.write(payload)
+
+    size = decoder.finish()
+    file.truncate(size)
+    return size
@@ -0,0 +1,183 @@
+"""SegWit addresses of BIP-173 and BIP-350 on top of bech32m
+
+The witness version, the variant of the checksum, the program length and
+the strict conversion of the program are all checked in the pass over the
+symbols that decodes the address.
+"""
+
+from enum import IntEnum
+from typing import Iterable, NamedTuple, Tuple, Union
+
+import bech32m
+from bech32m import BECH32M_CHECKSUM_LENGTH, Encoding
+
+# Human readable parts of mainnet, testnet and regtest addresses
+NETWORK_HRPS = frozenset(("bc", "tb", "bcrt"))
+
+MAX_WITNESS_VERSION = 16
+MIN_PROGRAM_LENGTH = 2
+MAX_PROGRAM_LENGTH = 40
+# Version 0 programs are either a key hash or a script hash
+V0_PROGRAM_LENGTHS = (20, 32)
+
+
+class SegwitStatus(IntEnum):
+    """Reason why a string is not a valid SegWit address"""
+
+    OK = 0
+    INVALID_BECH32 = 1
+    WRONG_HRP = 2
+    INVALID_VERSION = 3
+    WRONG_ENCODING = 4
+    INVALID_PADDING = 5
+    INVALID_PROGRAM_LENGTH = 6
+
+
+_MESSAGES = {
+    SegwitStatus.INVALID_BECH32: "Address is not a valid bech32 or bech32m string",
+    SegwitStatus.WRONG_HRP: "Address is for a different network",
+    SegwitStatus.INVALID_VERSION: "Witness version has to be in range [0-16]",
+    SegwitStatus.WRONG_ENCODING: (
+        "Witness version 0 needs the bech32 checksum, later versions bech32m"
+    ),
+    SegwitStatus.INVALID_PADDING: "Witness program has invalid padding",
+    SegwitStatus.INVALID_PROGRAM_LENGTH: "Witness program has invalid length",
+}
+
+
+class SegwitError(ValueError):
+    """SegWit rule the address or program breaks"""
+
+    def __init__(self, status: SegwitStatus) -> None:
+        super().__init__(status)
+        self.status = status
+
+    def __reduce__(self):  # type: ignore[no-untyped-def]
+        return type(self), (self.status,)
+
+    def __str__(self) -> str:
+        return _MESSAGES.get(self.status, self.status.name)
+
+
+class WitnessResult(NamedTuple):
+    """Outcome of decoding one address of a batch"""
+
+    status: SegwitStatus
+    version: int
+    program: bytes
+
+
+def _expected_encoding(version: int) -> Encoding:
+    return Encoding.BECH32 if version == 0 else Encoding.BECH32M
+
+
+def _program_status(version: int, length: int) -> SegwitStatus:
+    if not MIN_PROGRAM_LENGTH <= length <= MAX_PROGRAM_LENGTH:
+        return SegwitStatus.INVALID_PROGRAM_LENGTH
+    if version == 0 and length not in V0_PROGRAM_LENGTHS:
+        return SegwitStatus.INVALID_PROGRAM_LENGTH
+    return SegwitStatus.OK
+
+
+def _witness(symbols: bytes, encoding: Encoding) -> WitnessResult:
+    """Version and program from the data symbols including the checksum"""
+    if len(symbols) <= BECH32M_CHECKSUM_LENGTH:
+        return WitnessResult(SegwitStatus.INVALID_VERSION, 0, b"")
+    version = symbols[0]
+    if version > MAX_WITNESS_VERSION:
+        return WitnessResult(SegwitStatus.INVALID_VERSION, 0, b"")
+    if encoding != _expected_encoding(version):
+        return WitnessResult(SegwitStatus.WRONG_ENCODING, 0, b"")
+
+    # BIP-173 conversion, at most 4 padding bits, which have to be zero.
+    # `decode_data` keeps an extra byte exactly when the padding isn't zero.
+    program_symbols = symbols[1:-BECH32M_CHECKSUM_LENGTH]
+    length = len(program_symbols) * 5 // 8
+    program = bech32m.decode_data(program_symbols)
+    if len(program_symbols) * 5 % 8 > 4 or len(program) != length:
+        return WitnessResult(SegwitStatus.INVALID_PADDING, 0, b"")
+
+    status = _program_status(version, length)
+    if status:
+        return WitnessResult(status, 0, b"")
+    return WitnessResult(SegwitStatus.OK, version, program)
+
+
+def decode(hrp: str, address: Union[str, bytes]) -> Tuple[int, bytes]:
+    """Decode a SegWit address of the network `hrp` into (version, program)
+
+    Errors of the bech32 layer raise `Bech32mError` with the suggested
+    corrections, breaking the SegWit rules raises `SegwitError`.
+    """
+    _, human, symbols, encoding = bech32m.check_string(address)
+    if encoding is None:
+        # Raises the detailed error
+        bech32m.decode_any(address)
+    if human != hrp.lower():
+        raise SegwitError(SegwitStatus.WRONG_HRP)
+
+    result = _witness(symbols, encoding)
+    if result.status:
+        raise SegwitError(result.status)
+    return result.version, result.program
+
+
+def encode(hrp: str, version: int, program: bytes) -> str:
+    """Encode a witness program into a SegWit address of the network `hrp`"""
+    bech32m.check_human(hrp)
+    if not 0 <= version <= MAX_WITNESS_VERSION:
+        raise SegwitError(SegwitStatus.INVALID_VERSION)
+    status = _program_status(version, len(program))
+    if status:
+        raise SegwitError(status)
+
+    # BIP-173 conversion, the last symbol is padded with zero bits
+    padding = -len(program) * 8 % 5
+    value = int.from_bytes(program, "big") << padding
+    count = (len(program) * 8 + padding) // 5
+    symbols = bytes([version]) + bytes(
+        value >> 5 * (count - 1 - idx) & 31 for idx in range(count)
+    )
+
+    hrp = hrp.lower()
+    checksum = bech32m.Bech32mChecksum(hrp, symbols)
+    symbols += checksum.digest(_expected_encoding(version))
+    return hrp + "1" + bech32m.bytes_to_base32(symbols)
+
+
+def decode_many(
+    hrp: str, addresses: Iterable[Union[str, bytes]]
+) -> list[WitnessResult]:
+    """Decode a batch of addresses of the network `hrp`, failures are reported
+    per address
+
+    Only an invalid `hrp` raises `Bech32mError` and, as with
+    `bech32m.decode_many`, an item that is neither str nor a bytes-like object
+    raises TypeError. Every address is checked and its checksum classified by
+    `bech32m.check_string` in one pass, the version, padding and length rules
+    are then applied to its symbols.
+    """
+    hrp = hrp.lower()
+    if hrp not in NETWORK_HRPS:
+        bech32m.check_human(hrp)
+
+    invalid = WitnessResult(SegwitStatus.INVALID_BECH32, 0, b"")
+    wrong_hrp = WitnessResult(SegwitStatus.WRONG_HRP, 0, b"")
+    results: list[WitnessResult] = []
+    append = results.append
+    for address in addresses:
+        _, human, symbols, encoding = bech32m.check_string(address)
+        if encoding is None:
+            append(invalid)
+        elif human != hrp:
+            append(wrong_hrp)
+        else:
+            append(_witness(symbols, encoding))
+
+    return results
+
+
+def encode_many(hrp: str, programs: Iterable[Tuple[int, bytes]]) -> list[str]:
+    """Encode a batch of (version, program) pairs of the network `hrp`,
+    raises `SegwitError` on the first invalid one"""
+    return [encode(hrp, version, program) for version, program in programs]
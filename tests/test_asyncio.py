@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bech32m
+import bech32m_asyncio
+import pytest
+
+VALID = bech32m.encode("bc", bytes(range(20)))
+# One wrong character, the correction is suggested
+TYPO = VALID[:10] + ("q" if VALID[10] != "q" else "p") + VALID[11:]
+
+
+async def read_lines(decoder, lines):
+    reader = asyncio.StreamReader()
+    reader.feed_data("".join(line + "\n" for line in lines).encode())
+    reader.feed_eof()
+    return [item async for item in decoder.stream(reader)]
+
+
+def test_async_decode():
+    async def run():
+        with ThreadPoolExecutor(2) as executor:
+            async with bech32m_asyncio.AsyncDecoder(executor=executor) as decoder:
+                assert await decoder.decode(VALID) == bech32m.decode(VALID)
+                with pytest.raises(bech32m.Bech32mError) as info:
+                    await decoder.decode(TYPO)
+                assert info.value.suggestions == [VALID]
+                with pytest.raises(bech32m.Bech32mError) as info:
+                    await decoder.decode("bc")
+                assert info.value.status == bech32m.Status.MISSING_SEPARATOR
+
+    asyncio.run(run())
+
+
+def test_async_decode_process_pool_and_timeout():
+    async def run():
+        async with bech32m_asyncio.AsyncDecoder() as decoder:
+            with pytest.raises(bech32m.Bech32mError) as info:
+                await decoder.decode(TYPO)
+            assert info.value.suggestions == [VALID]
+
+        async with bech32m_asyncio.AsyncDecoder(timeout=0) as decoder:
+            with pytest.raises(asyncio.TimeoutError):
+                await decoder.decode(TYPO)
+
+    asyncio.run(run())
+
+
+def test_async_stream_keeps_order():
+    lines = [VALID, TYPO, "", "bc1qqqqqqq", "x"] * 5 + [VALID]
+
+    async def run():
+        with ThreadPoolExecutor(2) as executor:
+            decoder = bech32m_asyncio.AsyncDecoder(max_pending=2, executor=executor)
+            return await read_lines(decoder, lines)
+
+    results = asyncio.run(run())
+    assert [string for string, _ in results] == [line for line in lines if line]
+    for string, outcome in results:
+        if string == VALID:
+            assert outcome == bech32m.decode(VALID)
+        else:
+            assert isinstance(outcome, bech32m.Bech32mError)
+            assert outcome.suggestions == ([VALID] if string == TYPO else [])
+
+
+def test_async_stream_cancel():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data((TYPO + "\n" + VALID + "\n").encode())
+        received = []
+
+        async def consume():
+            with ThreadPoolExecutor(1) as executor:
+                decoder = bech32m_asyncio.AsyncDecoder(executor=executor)
+                async for item in decoder.stream(reader):
+                    received.append(item)
+
+        task = asyncio.ensure_future(consume())
+        # The stream never ends, so the consumer has to be cancelled
+        while len(received) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return received
+
+    received = asyncio.run(asyncio.wait_for(run(), 10))
+    assert [string for string, _ in received] == [TYPO, VALID]
+
+
+def test_async_stream_late_input():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data((TYPO + "\n").encode())
+
+        async def feed():
+            # Arrives after the correction of the first line is done
+            await asyncio.sleep(0.2)
+            reader.feed_data((VALID + "\n").encode())
+            reader.feed_eof()
+
+        with ThreadPoolExecutor(1) as executor:
+            decoder = bech32m_asyncio.AsyncDecoder(executor=executor)
+            feeding = asyncio.ensure_future(feed())
+            received = [item async for item in decoder.stream(reader)]
+            await feeding
+        return received
+
+    received = asyncio.run(asyncio.wait_for(run(), 10))
+    assert [string for string, _ in received] == [TYPO, VALID]
+    assert received[1][1] == bech32m.decode(VALID)
+
+
+def test_async_timeouts_keep_executor_bounded(monkeypatch):
+    release = threading.Event()
+    started = []
+
+    def slow_outcome(string, max_errors, max_length):
+        started.append(string)
+        release.wait(10)
+        return ("bc", b"")
+
+    monkeypatch.setattr(bech32m_asyncio, "_decode_outcome", slow_outcome)
+
+    async def run():
+        with ThreadPoolExecutor(4) as executor:
+            decoder = bech32m_asyncio.AsyncDecoder(
+                timeout=0.05, max_pending=2, executor=executor
+            )
+            for _ in range(2):
+                with pytest.raises(asyncio.TimeoutError):
+                    await decoder.decode(TYPO)
+            # Both slots are taken by the jobs that timed out
+            waiting = asyncio.ensure_future(decoder.decode(TYPO))
+            await asyncio.sleep(0.2)
+            assert len(started) == 2 and not waiting.done()
+            release.set()
+            assert await waiting == ("bc", b"")
+            assert len(started) == 3
+
+    asyncio.run(asyncio.wait_for(run(), 10))
@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+
+
+def test_benchmark_gate(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    command = [sys.executable, "benchmarks/suite.py", "--quick", "--repeat", "1"]
+    command += ["--only", "polymod", "decode_invalid"]
+    subprocess.run(command + ["--save", str(baseline)], check=True)
+    metrics = json.loads(baseline.read_text())["metrics"]
+    assert set(metrics) == {"polymod", "decode_invalid"}
+
+    # Everything is slower than a baseline 1000 times faster
+    for name in metrics:
+        metrics[name] /= 1000
+    baseline.write_text(json.dumps({"version": 1, "metrics": metrics}))
+    result = subprocess.run(
+        command + ["--compare", str(baseline)], capture_output=True, text=True
+    )
+    assert result.returncode == 1
+    assert result.stdout.count("REGRESSED") == 2
+
+    result = subprocess.run(
+        command + ["--compare", str(baseline), "--threshold", "10000"],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0
@@ -0,0 +1,51 @@
+import io
+import random
+import bech32m
+import bech32m_columns
+import pytest
+
+
+def random_strings(count: int):
+    rng = random.Random(21)
+    strings = [
+        bech32m.encode(rng.choice(["bc", "tb"]), rng.randbytes(rng.randrange(33)))
+        for _ in range(count)
+    ]
+    for idx in range(0, count, 7):
+        strings[idx] = strings[idx][:-1] + "1"
+    return strings
+
+
+def test_columns_match_decode_many(monkeypatch):
+    monkeypatch.setattr(bech32m_columns, "CHUNK_ROWS", 100)
+    strings = random_strings(1000)
+    columns = bech32m_columns.DecodedColumns.from_strings(strings)
+    expected = bech32m.decode_many(strings)
+
+    assert len(columns) == len(expected)
+    assert [(row.status, row.human, bytes(row.data)) for row in columns] == expected
+    assert sorted(columns.hrps) == ["", "bc", "tb"]
+    assert columns.row(-1) == columns.row(999)
+    assert isinstance(columns.row(3).data, memoryview)
+    with pytest.raises(IndexError):
+        columns.row(1000)
+
+
+def test_columns_save_load():
+    columns = bech32m_columns.DecodedColumns.from_strings(random_strings(300))
+    file = io.BytesIO()
+    columns.save(file)
+
+    file.seek(0)
+    loaded = bech32m_columns.DecodedColumns.load(file)
+    assert list(loaded) == list(columns)
+    assert loaded.offsets == columns.offsets
+
+    loaded.append(bech32m.Status.OK, "bc", b"\x01")
+    assert loaded.hrps == columns.hrps
+    assert loaded.row(300) == (bech32m.Status.OK, "bc", b"\x01")
+
+    with pytest.raises(ValueError):
+        bech32m_columns.DecodedColumns.load(io.BytesIO(file.getvalue()[:-1]))
+    with pytest.raises(ValueError):
+        bech32m_columns.DecodedColumns.load(io.BytesIO(b"nope" + file.getvalue()[4:]))
@@ -1,6 +1,14 @@
+import base64
+import bech32m
 import cli
+import json
+import os
 import pytest
+import shutil
 import subprocess
+import tempfile
+import threading
+import time
 
 
 """
@@ -297,3 +305,349 @@ def test_decode_hex_stdin():
     )
 
     assert result.rstrip() == "ffffffffffffffff"
+
+
+def test_long_mode_roundtrip(tmp_path):
+    data = bytes(range(256)) * 8
+    (tmp_path / "input.bin").write_bytes(data)
+
+    with pytest.raises(subprocess.SubprocessError):
+        subprocess.check_output(
+            ["python3", "cli.py", "-i", tmp_path / "input.bin", "-inform", "binary"],
+            timeout=10,
+        )
+
+    encoded = subprocess.check_output(
+        [
+            "python3",
+            "cli.py",
+            "-i",
+            tmp_path / "input.bin",
+            "-inform",
+            "binary",
+            "--max-length",
+            "0",
+        ],
+        text=True,
+        timeout=10,
+    )
+    assert encoded.rstrip() == bech32m.encode("default_hrp", data, max_length=None)
+
+    result = subprocess.check_output(
+        ["python3", "cli.py", "-d", "-outform", "base64", "--max-length", "0"],
+        input=encoded,
+        text=True,
+        timeout=10,
+    )
+    assert result == base64.encodebytes(data).decode("ascii")
+
+    # A corrupted string writes nothing, neither to stdout nor to a file
+    corrupted = encoded[:100] + ("q" if encoded[100] != "q" else "p") + encoded[101:]
+    corrupted = corrupted.encode("ascii")
+    command = ["python3", "cli.py", "-d", "--max-length", "0"]
+    result = subprocess.run(command, input=corrupted, capture_output=True, timeout=10)
+    assert result.returncode != 0 and result.stdout == b""
+    output = tmp_path / "output.bin"
+    command += ["-outform", "binary", "-o", output]
+    result = subprocess.run(command, input=corrupted, capture_output=True, timeout=10)
+    assert result.returncode != 0 and not output.exists()
+
+    # Too long for the limit, found upfront for files and after a spool on stdin
+    command = ["python3", "cli.py", "-inform", "binary", "--max-length", "3000"]
+    result = subprocess.run(
+        command + ["-i", tmp_path / "input.bin", "-o", output],
+        capture_output=True,
+        timeout=10,
+    )
+    assert result.returncode != 0 and not output.exists()
+    result = subprocess.run(command, input=data, capture_output=True, timeout=10)
+    assert result.returncode != 0 and result.stdout == b""
+
+
+def test_parts_roundtrip(tmp_path):
+    data = bytes(range(256)) * 20
+    (tmp_path / "input.bin").write_bytes(data)
+
+    parts = subprocess.check_output(
+        [
+            "python3",
+            "cli.py",
+            "--parts",
+            "-i",
+            tmp_path / "input.bin",
+            "-inform",
+            "binary",
+        ],
+        text=True,
+        timeout=10,
+    ).splitlines()
+    assert len(parts) > 1
+    assert all(len(part) <= 90 for part in parts)
+
+    subprocess.check_output(
+        [
+            "python3",
+            "cli.py",
+            "-d",
+            "--parts",
+            "-outform",
+            "binary",
+            "-o",
+            tmp_path / "output.bin",
+        ],
+        input="\n".join(reversed(parts)),
+        text=True,
+        timeout=10,
+    )
+    assert (tmp_path / "output.bin").read_bytes() == data
+
+    result = subprocess.check_output(
+        ["python3", "cli.py", "-d", "--parts", "-outform", "hex"],
+        input="\n".join(parts[1:] + parts[:1]),
+        text=True,
+        timeout=10,
+    )
+    assert result == data.hex()
+
+    # Long parts read back with the same --max-length
+    long_parts = subprocess.check_output(
+        ["python3", "cli.py", "--parts", "--max-length", "5000", "-inform", "binary"],
+        input=data * 10,
+        timeout=10,
+    ).splitlines()
+    assert any(len(part) > 1023 for part in long_parts)
+    result = subprocess.check_output(
+        ["python3", "cli.py", "-d", "--parts", "--max-length", "5000"],
+        input=b"\n".join(long_parts),
+        timeout=10,
+    )
+    assert result == (data * 10).hex().encode("ascii")
+
+    # Missing parts leave no output behind, neither in a file nor on stdout
+    command = ["python3", "cli.py", "-d", "--parts", "-outform", "binary"]
+    missing = "\n".join(parts[:-1]).encode("ascii")
+    result = subprocess.run(command, input=missing, capture_output=True, timeout=10)
+    assert result.returncode != 0 and result.stdout == b""
+    output = tmp_path / "missing.bin"
+    result = subprocess.run(
+        command + ["-o", output], input=missing, capture_output=True, timeout=10
+    )
+    assert result.returncode != 0 and not output.exists()
+
+
+def test_batch_mode():
+    payloads = ["00ff", "", "zz", "ab" * 60, "0123456789"]
+    process = subprocess.run(
+        ["python3", "cli.py", "--batch", "-hrp", "bc"],
+        input="\n".join(payloads) + "\n",
+        capture_output=True,
+        text=True,
+        timeout=10,
+    )
+    assert process.returncode == 1
+    lines = [line.split("\t") for line in process.stdout.splitlines()]
+    assert [status for status, _ in lines] == [
+        "OK",
+        "OK",
+        "INVALID_FORMAT",
+        "TOO_LONG",
+        "OK",
+    ]
+    assert lines[0][1] == bech32m.encode("bc", bytes.fromhex("00ff"))
+
+    strings = [string for _, string in lines] + ["bc1qqqqqqq"]
+    process = subprocess.run(
+        ["python3", "cli.py", "-d", "--batch", "-outform", "base64"],
+        input="\n".join(strings),
+        capture_output=True,
+        text=True,
+        timeout=10,
+    )
+    lines = [line.split("\t") for line in process.stdout.splitlines()]
+    assert lines[0] == ["OK", base64.b64encode(bytes.fromhex("00ff")).decode()]
+    assert [status for status, _ in lines[2:4]] == ["MISSING_SEPARATOR"] * 2
+    assert lines[5][0] == "INVALID_CHECKSUM"
+
+    valid = subprocess.run(
+        ["python3", "cli.py", "-d", "--batch"],
+        input=strings[0] + "\n" + strings[4] + "\n",
+        capture_output=True,
+        text=True,
+        timeout=10,
+    )
+    assert valid.returncode == 0
+    assert valid.stdout == "OK\t00ff\nOK\t0123456789\n"
+
+
+def test_batch_jobs_keep_order():
+    assert list(cli.ordered_map(abs, range(-100, 0), 3)) == list(range(100, 0, -1))
+
+    strings = [bech32m.encode("bc", idx.to_bytes(4, "big")) for idx in range(3000)]
+    strings[1234] = "bc1qqqqqqq"
+    text = "\n".join(strings)
+    outputs = [
+        subprocess.run(
+            ["python3", "cli.py", "-d", "--batch", "--jobs", jobs],
+            input=text,
+            capture_output=True,
+            text=True,
+            timeout=30,
+        ).stdout
+        for jobs in ["1", "2"]
+    ]
+    assert outputs[0] == outputs[1]
+    lines = outputs[1].splitlines()
+    assert len(lines) == 3000
+    assert lines[1234].startswith("INVALID_CHECKSUM")
+    assert lines[2999] == "OK\t" + (2999).to_bytes(4, "big").hex()
+
+
+def test_batch_file_ranges(tmp_path):
+    strings = [bech32m.encode("bc", idx.to_bytes(3, "big")) for idx in range(50)]
+    text = "\n".join(strings[:25]) + "\r\n  \n" + "\n".join(strings[25:])
+    path = tmp_path / "input.txt"
+    path.write_text(text)
+
+    ranges = cli.split_ranges(str(path), 100)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(text)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(text[end - 1] == "\n" for _, end in ranges[:-1])
+    assert cli.split_ranges(str(path)) == [(0, len(text))]
+
+    output = "".join(
+        cli.process_range(str(path), file_range, False, "", cli.DataFormat.HEX, 90)[0]
+        for file_range in ranges
+    )
+    expected = subprocess.run(
+        ["python3", "cli.py", "-d", "--batch"],
+        input=text,
+        capture_output=True,
+        text=True,
+        timeout=10,
+    ).stdout
+    assert output == expected
+    assert expected.count("MISSING_SEPARATOR") == 1
+
+    result = subprocess.run(
+        ["python3", "cli.py", "-d", "--batch", "-i", path, "-j", "2"],
+        capture_output=True,
+        text=True,
+        timeout=10,
+    )
+    assert result.stdout == expected
+
+    (tmp_path / "empty.txt").write_text("")
+    assert cli.split_ranges(str(tmp_path / "empty.txt")) == []
+
+
+@pytest.mark.skipif(not cli.UNIX_SOCKETS, reason="needs Unix sockets")
+def test_daemon(tmp_path):
+    # Socket paths are limited to about 100 characters, tmp_path can be longer
+    socket_dir = tempfile.mkdtemp()
+    path = os.path.join(socket_dir, "bech32m.sock")
+    server = cli.make_server(path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        strings = [bech32m.encode("bc", bytes([idx]) * 20) for idx in range(10)]
+        strings.append("bc1qqqqqqq")
+        with cli.DaemonClient(path) as client:
+            assert client.decode_many(strings) == bech32m.decode_many(strings)
+            payloads = [bytes(20), bytes(60)]
+            expected = bech32m.encode_many("bc", payloads)
+            assert client.encode_many("bc", payloads) == expected
+
+            response = client.request({"op": "decode", "strings": [], "id": 7})
+            assert response == {"results": [], "id": 7}
+            with pytest.raises(ValueError, match="Unknown op"):
+                client.request({"op": "sign"})
+            with pytest.raises(ValueError, match="missing"):
+                client.request({"op": "decode"})
+            with pytest.raises(ValueError):
+                client.encode_many("", payloads)
+
+        with pytest.raises(ValueError, match="already listening"):
+            cli.make_server(path)
+
+        text = "\n".join(strings)
+        remote = subprocess.run(
+            ["python3", "cli.py", "-d", "--batch", "--socket", path],
+            input=text,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        local = subprocess.run(
+            ["python3", "cli.py", "-d", "--batch"],
+            input=text,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        assert remote.returncode == local.returncode == 1
+        assert remote.stdout == local.stdout
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(socket_dir)
+
+    precious = tmp_path / "precious.txt"
+    precious.write_text("keep me")
+    with pytest.raises(ValueError, match="not a socket"):
+        cli.make_server(str(precious))
+    assert precious.read_text() == "keep me"
+
+
+@pytest.mark.skipif(not cli.UNIX_SOCKETS, reason="needs Unix sockets")
+def test_daemon_terminated():
+    socket_dir = tempfile.mkdtemp()
+    path = os.path.join(socket_dir, "bech32m.sock")
+    daemon = subprocess.Popen(["python3", "cli.py", "--serve", path])
+    try:
+        for _ in range(200):
+            if os.path.exists(path):
+                break
+            time.sleep(0.05)
+        # An answer means the daemon is serving, with its handler installed
+        with cli.DaemonClient(path) as client:
+            assert client.decode_many([]) == []
+
+        daemon.terminate()
+        assert daemon.wait(timeout=10) == 0
+        assert not os.path.exists(path)
+    finally:
+        daemon.kill()
+        daemon.wait()
+        shutil.rmtree(socket_dir)
+
+
+def test_daemon_rejects_bad_requests():
+    requests = [
+        {"op": "decode", "strings": [4000000000]},
+        {"op": "decode", "strings": [10**30]},
+        {"op": "decode", "strings": "bc1qqqqqqq"},
+        {"op": "encode", "hrp": "bc", "data": [5]},
+        {"op": "encode", "hrp": 1, "data": []},
+        {"op": "decode", "strings": [], "max_length": "90"},
+        {"op": "decode", "strings": [], "max_length": True},
+    ]
+    for request in requests:
+        response = json.loads(cli.answer(json.dumps(request).encode()))
+        assert "error" in response
+
+    request = {"op": "decode", "strings": ["bc1qqqqqqq"], "max_length": None}
+    response = json.loads(cli.answer(json.dumps(request).encode()))
+    assert response == {"results": [{"status": "INVALID_CHECKSUM"}]}
+
+    # Data that isn't hex fail alone, the other items are answered
+    request = {"op": "encode", "hrp": "bc", "data": ["00", "zz", "0", "01"]}
+    response = json.loads(cli.answer(json.dumps(request).encode()))
+    strings = [bech32m.encode("bc", bytes([value])) for value in range(2)]
+    assert response == {
+        "results": [
+            {"status": "OK", "string": strings[0]},
+            {"status": "INVALID_FORMAT"},
+            {"status": "INVALID_FORMAT"},
+            {"status": "OK", "string": strings[1]},
+        ]
+    }
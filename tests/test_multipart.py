@@ -0,0 +1,72 @@
+import io
+import random
+import tracemalloc
+import multipart
+import pytest
+
+
+def random_parts(size: int, max_length=90):
+    rng = random.Random(size)
+    data = rng.randbytes(size)
+    chunks = [data[idx : idx + 7] for idx in range(0, size, 7)]
+    parts = list(multipart.encode_parts("default_hrp", chunks, size, max_length))
+    rng.shuffle(parts)
+    return data, parts
+
+
+def test_multipart_roundtrip():
+    for size in [0, 1, 34, 35, 36, 70, 1000, 5003]:
+        data, parts = random_parts(size)
+        assert all(len(part) <= 90 for part in parts)
+        assert b"".join(multipart.decode_parts(parts)) == data
+
+        out = io.BytesIO(b"x" * 10000)
+        assert multipart.decode_parts_into(parts, out) == size
+        assert out.getvalue() == data
+
+
+def test_multipart_long_parts():
+    data, parts = random_parts(5000, max_length=1023)
+    assert len(parts) == -(-5000 // multipart.part_capacity("default_hrp", 1023))
+    assert all(90 < len(part) <= 1023 for part in parts)
+    assert b"".join(multipart.decode_parts(parts)) == data
+
+
+def test_multipart_invalid():
+    data, parts = random_parts(500)
+
+    with pytest.raises(ValueError, match="Missing 1 part"):
+        list(multipart.decode_parts(parts[1:]))
+    with pytest.raises(ValueError, match="duplicated"):
+        list(multipart.decode_parts(parts + parts[:1]))
+
+    _, other = random_parts(600)
+    with pytest.raises(ValueError, match="different container"):
+        list(multipart.decode_parts(parts[:1] + other[:1]))
+
+    with pytest.raises(ValueError):
+        list(multipart.encode_parts("hrp", [data], len(data) + 1))
+
+
+def test_multipart_forged_total():
+    forged = multipart.encode_part("bc", 0, 0xFFFFFFFF, b"x" * 5)
+    tracemalloc.start()
+    try:
+        decoder = multipart.PartsDecoder()
+        assert decoder.add(forged) == [(0, b"x" * 5)]
+        assert tracemalloc.get_traced_memory()[1] < 1 << 20
+    finally:
+        tracemalloc.stop()
+
+    with pytest.raises(ValueError, match="maximum size"):
+        multipart.PartsDecoder(max_size=1 << 20).add(forged)
+    far = multipart.encode_part("bc", 0xFFFFFFF0, 0xFFFFFFFF, b"x" * 5)
+    with pytest.raises(ValueError, match="maximum size"):
+        multipart.decode_parts_into([far], io.BytesIO(), max_size=1 << 20)
+
+    data, parts = random_parts(5003)
+    assert b"".join(multipart.decode_parts(parts, max_size=5003)) == data
+    with pytest.raises(ValueError, match="maximum size"):
+        list(multipart.decode_parts(parts, max_size=5002))
+    with pytest.raises(ValueError, match="duplicated"):
+        list(multipart.decode_parts(parts + parts[len(parts) // 2 :]))
@@ -0,0 +1,58 @@
+import random
+import bech32m
+import pytest
+
+np = pytest.importorskip("numpy")
+bech32m_numpy = pytest.importorskip("bech32m_numpy")
+
+
+def test_numpy_encode_matches_scalar():
+    rng = random.Random(13)
+    for size in [0, 1, 2, 4, 5, 20, 32, 40]:
+        payloads = [rng.randbytes(size) for _ in range(50)]
+        payloads.append(bytes(size))
+        expected = [bech32m.encode("Bc", payload) for payload in payloads]
+        assert bech32m_numpy.encode("Bc", payloads) == expected
+
+        matrix = np.frombuffer(b"".join(payloads), dtype=np.uint8)
+        matrix = matrix.reshape(len(payloads), size)
+        assert bech32m_numpy.encode("Bc", matrix) == expected
+
+    with pytest.raises(bech32m.Bech32mError):
+        bech32m_numpy.encode("bc", [bytes(60)])
+
+
+def test_numpy_decode_matches_scalar():
+    rng = random.Random(13)
+    for size in [0, 1, 3, 20, 32]:
+        strings = [bech32m.encode("bc", rng.randbytes(size)) for _ in range(80)]
+        # Zero padding bits are dropped, so not all strings are equally long
+        strings = [string for string in strings if len(string) == len(strings[0])]
+        strings = (strings * 50)[:50]
+        # All kinds of invalid rows of the same length
+        for idx in range(0, 50, 5):
+            string = strings[idx]
+            pos = rng.randrange(len(string))
+            strings[idx] = string[:pos] + rng.choice("qpzB1é") + string[pos + 1 :]
+        strings[1] = strings[1].upper()
+        strings[2] = "tb" + strings[2][2:]
+
+        valid, data = bech32m_numpy.decode("bc", strings)
+        assert data.shape == (50, -(-(len(strings[0]) - 9) * 5 // 8))
+        for string, ok, row in zip(strings, valid, data):
+            try:
+                human, expected = bech32m.decode(string, correct=False)
+            except bech32m.Bech32mError:
+                assert not ok and not row.any()
+                continue
+            assert ok and human == "bc"
+            assert row.tobytes().startswith(expected)
+            assert not row.tobytes()[len(expected) :].strip(b"\0")
+
+
+def test_numpy_decode_invalid_shapes():
+    with pytest.raises(ValueError):
+        bech32m_numpy.decode("bc", ["bc1qqqqqqq", "bc1qqqqqqqq"])
+
+    valid, data = bech32m_numpy.decode("bc", ["bc1qqqq"])
+    assert not valid.any() and data.shape == (1, 0)
@@ -0,0 +1,96 @@
+import bech32m
+import pytest
+import segwit
+
+VALID_ADDRESSES = [
+    ("BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4", 0, "751e76e8199196d454941c45d1b3a323f1433bd6"),
+    (
+        "tb1qrp33g0q5c5txsp9arysrx4k6zdkfs4nce4xj0gdcccefvpysxf3q0sl5k7",
+        0,
+        "1863143c14c5166804bd19203356da136c985678cd4d27a1b8c6329604903262",
+    ),
+    (
+        "bc1pw508d6qejxtdg4y5r3zarvary0c5xw7kw508d6qejxtdg4y5r3zarvary0c5xw7kt5nd6y",
+        1,
+        "751e76e8199196d454941c45d1b3a323f1433bd6751e76e8199196d454941c45d1b3a323f1433bd6",
+    ),
+    ("BC1SW50QGDZ25J", 16, "751e"),
+    ("bc1zw508d6qejxtdg4y5r3zarvaryvaxxpcs", 2, "751e76e8199196d454941c45d1b3a323"),
+    (
+        "tb1qqqqqp399et2xygdj5xreqhjjvcmzhxw4aywxecjdzew6hylgvsesrxh6hy",
+        0,
+        "000000c4a5cad46221b2a187905e5266362b99d5e91c6ce24d165dab93e86433",
+    ),
+    (
+        "tb1pqqqqp399et2xygdj5xreqhjjvcmzhxw4aywxecjdzew6hylgvsesf3hn0c",
+        1,
+        "000000c4a5cad46221b2a187905e5266362b99d5e91c6ce24d165dab93e86433",
+    ),
+    (
+        "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqzk5jj0",
+        1,
+        "79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798",
+    ),
+]
+
+INVALID_ADDRESSES = [
+    "tc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vq5zuyut",
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqh2y7hd",
+    "tb1z0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vqglt7rf",
+    "BC1S0XLXVLHEMJA6C4DQV22UAPCTQUPFHLXM9H8Z3K2E72Q4K9HCZ7VQ54WELL",
+    "bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kemeawh",
+    "tb1q0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vq24jc47",
+    "bc1p38j9r5y49hruaue7wxjce0updqjuyyx0kh56v8s25huc6995vvpql3jow4",
+    "BC130XLXVLHEMJA6C4DQV22UAPCTQUPFHLXM9H8Z3K2E72Q4K9HCZ7VQ7ZWS8R",
+    "bc1pw5dgrnzv",
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7v8n0nx0muaewav253zgeav",
+    "BC1QR508D6QEJXTDG4Y5R3ZARVARYV98GJ9P",
+    "tb1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vq47Zagq",
+    "bc1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7v07qwwzcrf",
+    "tb1p0xlxvlhemja6c4dqv22uapctqupfhlxm9h8z3k2e72q4k9hcz7vpggkg4j",
+    "bc1gmk9yu",
+]
+
+
+def test_segwit_valid():
+    for address, version, program in VALID_ADDRESSES:
+        hrp = address[:2].lower()
+        assert segwit.decode(hrp, address) == (version, bytes.fromhex(program))
+        assert segwit.encode(hrp, version, bytes.fromhex(program)) == address.lower()
+
+    results = segwit.decode_many("bc", [address for address, _, _ in VALID_ADDRESSES])
+    for (address, version, program), result in zip(VALID_ADDRESSES, results):
+        if address[:2].lower() == "bc":
+            assert result == (segwit.SegwitStatus.OK, version, bytes.fromhex(program))
+        else:
+            assert result.status == segwit.SegwitStatus.WRONG_HRP
+
+
+def test_segwit_invalid():
+    for hrp in ["bc", "tb"]:
+        for address in INVALID_ADDRESSES:
+            with pytest.raises(ValueError):
+                segwit.decode(hrp, address)
+        results = segwit.decode_many(hrp, INVALID_ADDRESSES)
+        assert all(result == (result.status, 0, b"") for result in results)
+        assert all(result.status != segwit.SegwitStatus.OK for result in results)
+
+    statuses = [result.status for result in segwit.decode_many("bc", INVALID_ADDRESSES)]
+    assert statuses[1] == segwit.SegwitStatus.WRONG_ENCODING
+    assert statuses[7] == segwit.SegwitStatus.INVALID_VERSION
+    assert statuses[12] == segwit.SegwitStatus.INVALID_PADDING
+
+    # Only the network itself raises
+    with pytest.raises(bech32m.Bech32mError):
+        segwit.decode_many("b c", INVALID_ADDRESSES)
+
+
+def test_segwit_encode_invalid():
+    with pytest.raises(segwit.SegwitError):
+        segwit.encode("bc", 17, bytes(20))
+    with pytest.raises(segwit.SegwitError):
+        segwit.encode("bc", 0, bytes(21))
+    with pytest.raises(segwit.SegwitError):
+        segwit.encode_many("bc", [(1, bytes(32)), (1, bytes(41))])
+    with pytest.raises(bech32m.Bech32mError):
+        segwit.encode("", 1, bytes(32))
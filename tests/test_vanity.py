@@ -0,0 +1,50 @@
+import threading
+
+import bech32m
+import pytest
+import vanity
+
+
+def test_vanity_matches_encode():
+    found = list(vanity.search("bc", "qqq", 3, "zz", limit=None))
+    expected = []
+    for index in range(32**3):
+        symbols = bech32m.base32_to_bytes("qqq") + vanity._index_symbols(index, 3)
+        string = "bc1" + bech32m.bytes_to_base32(
+            symbols + bech32m.create_checksum("bc", symbols)
+        )
+        if string.endswith("zz"):
+            expected.append(string)
+    assert found == expected
+    assert list(vanity.search("BC", "QQQ", 3, "ZZ", limit=5, jobs=2)) == expected[:5]
+
+    found = list(vanity.search("tb", "x", 3, "q", 3, encoding=bech32m.Encoding.BECH32))
+    assert len(found) == 3
+    for string in found:
+        assert string.startswith("tb1x") and string.endswith("q")
+        assert bech32m.decode_any(string)[0] == bech32m.Encoding.BECH32
+
+
+def test_vanity_progress_cancel():
+    cancel = threading.Event()
+    reports = []
+
+    def progress(state):
+        reports.append(state)
+        cancel.set()
+
+    assert list(vanity.search("bc", "q", 6, "qqqqqq", None, progress=progress, cancel=cancel)) == []
+    assert len(reports) == 1
+    assert reports[0].candidates == 32**vanity.BLOCK_LEVELS
+    assert reports[0].total == 32**6
+
+
+def test_vanity_invalid():
+    with pytest.raises(ValueError):
+        next(vanity.search("bc", "qb", 3))
+    with pytest.raises(ValueError):
+        next(vanity.search("bc", "q", 3, "qqqqqqq"))
+    with pytest.raises(ValueError):
+        next(vanity.search("bc", "q", 0))
+    with pytest.raises(bech32m.Bech32mError):
+        next(vanity.search("bc", "q" * 80, 3))
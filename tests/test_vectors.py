@@ -1,3 +1,4 @@
+import random
 import bech32m
 import pytest
 
@@ -163,3 +164,507 @@ def test_bech32m_decode_invalid():
     for string in INVALID_BECH32M:
         with pytest.raises(Exception):
             bech32m.decode(string)
+
+
+def test_polymod_matches_reference():
+    rng = random.Random(350)
+    for length in range(0, 200):
+        values = bytes(rng.randrange(32) for _ in range(length))
+        assert bech32m.polymod(values) == bech32m.polymod_reference(values)
+
+
+def test_hrp_state_cache():
+    bech32m.hrp_state.cache_clear()
+    for _ in range(4):
+        bech32m.decode("abcdef1l7aum6echk45nj3s0wdvt2fg8x9yrzpqzd3ryx")
+    assert bech32m.hrp_state("abcdef") == bech32m.polymod(bech32m.hrp_expand("abcdef"))
+    assert bech32m.hrp_cache_hit_rate() == 0.8
+
+
+# Lowercase characters allowed in the human readable part, without the separator
+HRP_ALPHABET = "".join(
+    chr(c) for c in range(33, 127) if chr(c) != "1" and not chr(c).isupper()
+)
+
+
+def test_detect_single_error():
+    rng = random.Random(173)
+    for string in VALID_BECH32M:
+        string = string.lower()
+        human, data = string.rsplit("1", maxsplit=1)
+        for idx, char in enumerate(string):
+            if idx == len(human):
+                continue
+            alphabet = BECH32_CHARSET if idx > len(human) else HRP_ALPHABET
+            wrong = rng.choice(alphabet.replace(char, ""))
+            broken = string[:idx] + wrong + string[idx + 1 :]
+            broken_human, broken_data = broken.rsplit("1", maxsplit=1)
+            if len(broken_human) != len(human):
+                continue
+            assert (
+                bech32m.detect_single_error(broken_human, base32_to_bytes(broken_data))
+                == string
+            )
+            with pytest.raises(ValueError, match=string.replace("?", "\\?")):
+                bech32m.decode(broken)
+
+
+def test_detect_single_error_none():
+    human, data = "abcdef", base32_to_bytes("l7aum6echk45nj3s0wdvt2fg8x9yrzpqzd3ryx")
+    assert bech32m.detect_single_error(human, data) is None
+    broken = bytearray(data)
+    broken[0] ^= 1
+    broken[5] ^= 3
+    assert bech32m.detect_single_error(human, bytes(broken)) is None
+
+
+def test_find_corrections_errors_and_erasures():
+    rng = random.Random(1023)
+    for _ in range(200):
+        human = rng.choice(["bc", "tb", "bcrt", "abcdef"])
+        string = bech32m.encode(human, rng.randbytes(rng.choice([20, 32, 40])))
+        data_positions = range(len(human) + 1, len(string))
+
+        # Each erasure uses one, each error two of the 4 correctable symbols
+        erasures = rng.sample(data_positions, rng.randrange(5))
+        errors = rng.randrange((4 - len(erasures)) // 2 + 1)
+        chars = list(string)
+        for idx in erasures:
+            chars[idx] = "?"
+        free = [idx for idx in data_positions if idx not in erasures]
+        for idx in rng.sample(free, errors):
+            chars[idx] = rng.choice(BECH32_CHARSET.replace(chars[idx], ""))
+
+        assert bech32m.find_corrections("".join(chars)) == [string]
+
+
+def test_find_corrections_explicit_erasures():
+    string = "abcdef1l7aum6echk45nj3s0wdvt2fg8x9yrzpqzd3ryx"
+    broken = string[:10] + "q" + string[11:20] + "q" + string[21:]
+    assert bech32m.find_corrections(broken, max_errors=0) == []
+    assert bech32m.find_corrections(broken, max_errors=0, erasures=[10, 20]) == [
+        string
+    ]
+    with pytest.raises(ValueError):
+        bech32m.find_corrections(broken, erasures=[3])
+    with pytest.raises(ValueError):
+        bech32m.find_corrections("abcdef1?????" + string[12:])
+
+
+def test_decode_suggests_two_error_correction():
+    string = "split1checkupstagehandshakeupstreamerranterredcaperredlc445v"
+    broken = string[:8] + "q" + string[9:30] + "p" + string[31:]
+    with pytest.raises(ValueError, match="more than one"):
+        bech32m.decode(broken)
+    with pytest.raises(ValueError, match=string):
+        bech32m.decode(broken, max_errors=2)
+
+
+def test_is_valid():
+    for string in VALID_BECH32M:
+        assert bech32m.is_valid(string)
+    for string in INVALID_BECH32M:
+        assert not bech32m.is_valid(string)
+    assert not bech32m.is_valid("abcdef1l7aum6echk45nj3s0wdvt2fg8x9yrzpqzd3ryy")
+
+
+INVALID_BECH32M_STATUS = [
+    ("\x20" + "1xj0phk", bech32m.Status.HRP_CHARACTER),
+    ("qyrz8wqd2c9m", bech32m.Status.MISSING_SEPARATOR),
+    ("1qyrz8wqd2c9m", bech32m.Status.HRP_LENGTH),
+    ("lt1igcx5c0", bech32m.Status.INVALID_CHARACTER),
+    ("in1muywd", bech32m.Status.CHECKSUM_TOO_SHORT),
+    ("M1VUXWEZ", bech32m.Status.INVALID_CHECKSUM),
+    ("A1lqfn3a", bech32m.Status.MIXED_CASE),
+    ("a" * 84 + "1lqfn3a", bech32m.Status.TOO_LONG),
+]
+
+
+def test_decode_error_status():
+    for string, status in INVALID_BECH32M_STATUS:
+        with pytest.raises(bech32m.Bech32mError) as info:
+            bech32m.decode(string)
+        assert info.value.status == status
+
+
+def test_decode_without_correction():
+    broken = "abcdef1l7aum6echk45nj3s0wdvt2fg8x9yrzpqzd3ryy"
+    with pytest.raises(bech32m.Bech32mError) as info:
+        bech32m.decode(broken, correct=False)
+    assert info.value.status == bech32m.Status.INVALID_CHECKSUM
+    assert info.value.suggestions == []
+    assert str(info.value) == "The string is not valid."
+
+    with pytest.raises(bech32m.Bech32mError) as info:
+        bech32m.decode(broken)
+    assert info.value.suggestions == ["abcdef1l7aum6echk45nj3s0wdvt2fg8x9yrzpqzd3ryx"]
+
+
+def test_checksum_object():
+    string = "split1checkupstagehandshakeupstreamerranterredcaperredlc445v"
+    data = base32_to_bytes(string[6:])
+
+    checksum = bech32m.Bech32mChecksum("split")
+    for idx in range(0, len(data) - 6, 7):
+        checksum.update(data[idx : min(idx + 7, len(data) - 6)])
+    fork = checksum.copy()
+    assert checksum.digest() == data[-6:]
+
+    checksum.update(data[-6:])
+    assert checksum.verify()
+    assert not fork.verify()
+    fork.update(data[-6:-1] + bytes([data[-1] ^ 1]))
+    assert not fork.verify()
+
+
+def test_long_mode():
+    data = bytes(range(256)) * 3
+    with pytest.raises(bech32m.Bech32mError):
+        bech32m.encode("long", data[:100])
+    string = bech32m.encode("long", data, max_length=None)
+    assert len(string) > bech32m.BECH32M_LONG_MAX_LENGTH
+    assert bech32m.decode(string, max_length=None) == ("long", data)
+    assert bech32m.is_valid(string, max_length=None)
+    assert not bech32m.is_valid(string, max_length=bech32m.BECH32M_LONG_MAX_LENGTH)
+
+
+def test_stream_encode_decode():
+    data = bytes(range(256)) * 3
+    string = bech32m.encode("long", data, max_length=None)
+
+    for chunk_size in (1, 7, 100, 1000):
+        encoder = bech32m.StreamEncoder("LONG", max_length=None)
+        pieces = [
+            encoder.feed(data[idx : idx + chunk_size])
+            for idx in range(0, len(data), chunk_size)
+        ]
+        assert "".join(pieces) + encoder.finish() == string
+
+        decoder = bech32m.StreamDecoder(max_length=None)
+        decoded = b"".join(
+            decoder.feed(string[idx : idx + chunk_size])
+            for idx in range(0, len(string), chunk_size)
+        )
+        assert decoded + decoder.finish() == data
+        assert decoder.human == "long"
+
+    decoder = bech32m.StreamDecoder(max_length=None)
+    decoder.feed(string[:-1] + "q")
+    with pytest.raises(bech32m.Bech32mError):
+        decoder.finish()
+
+    with pytest.raises(bech32m.Bech32mError):
+        bech32m.StreamDecoder().feed(string)
+
+
+def test_stream_decode_short_strings():
+    for string, ref in DECODE_BECH32M_MATCH:
+        decoder = bech32m.StreamDecoder()
+        decoded = decoder.feed(string)
+        assert (decoded + decoder.finish()).hex() == ref
+
+    for string in INVALID_BECH32M:
+        with pytest.raises(ValueError):
+            decoder = bech32m.StreamDecoder()
+            decoder.feed(string)
+            decoder.finish()
+
+
+def encode_data_reference(data: bytes) -> bytes:
+    # The bit by bit conversion with the original padding rules
+    encoded_bytes = bytearray()
+    reg = 0
+    stored_bits = 0
+    for byte in data:
+        reg = ((reg << 8) | byte) & 0xFFF
+        stored_bits += 8
+        while stored_bits >= 5:
+            stored_bits -= 5
+            encoded_bytes.append((reg >> stored_bits) & 0x1F)
+    if stored_bits != 0 and (reg << (5 - stored_bits)) & 0x1F != 0:
+        encoded_bytes.append((reg << (5 - stored_bits)) & 0x1F)
+    return bytes(encoded_bytes)
+
+
+def decode_data_reference(data: bytes) -> bytes:
+    decoded_bytes = bytearray()
+    reg = 0
+    stored_bits = 0
+    for byte in data:
+        reg = ((reg << 5) | byte) & 0xFFF
+        stored_bits += 5
+        if stored_bits >= 8:
+            stored_bits -= 8
+            decoded_bytes.append((reg >> stored_bits) & 0xFF)
+    if stored_bits > 0 and (reg << (8 - stored_bits)) & 0xFF != 0:
+        decoded_bytes.append((reg << (8 - stored_bits)) & 0xFF)
+    return bytes(decoded_bytes)
+
+
+def test_block_conversion_matches_bitwise():
+    rng = random.Random(85)
+    for length in range(0, 100):
+        data = rng.randbytes(length)
+        symbols = bytes(rng.randrange(32) for _ in range(length))
+        # Trailing zero bits exercise the padding rules
+        for raw in (data, data + bytes(3)):
+            assert bech32m.encode_data(raw) == encode_data_reference(raw)
+        for raw in (symbols, symbols + bytes(3)):
+            assert bech32m.decode_data(raw) == decode_data_reference(raw)
+
+
+def test_decode_bytes_input():
+    for string, ref in DECODE_BECH32M_MATCH:
+        raw = string.encode("ascii")
+        assert bech32m.decode(raw) == bech32m.decode(string)
+        assert bech32m.decode(bytearray(raw))[1].hex() == ref
+        assert bech32m.is_valid(raw)
+
+    for string in INVALID_BECH32M:
+        raw = string.encode("latin-1")
+        with pytest.raises(bech32m.Bech32mError):
+            bech32m.decode(raw)
+        assert not bech32m.is_valid(raw)
+
+
+def test_charset_mapping():
+    assert bech32m.base32_to_bytes(BECH32_CHARSET) == bytes(range(32))
+    assert bech32m.bytes_to_base32(bytes(range(32))) == BECH32_CHARSET
+    for string in ("b", "Q", "qq1", "qĀ", "q\x00"):
+        with pytest.raises(bech32m.Bech32mError):
+            bech32m.base32_to_bytes(string)
+
+
+def test_decode_into():
+    scratch = bytearray(100)
+    for string, ref in DECODE_BECH32M_MATCH:
+        for source in (string, memoryview(string.encode("ascii"))):
+            count = bech32m.decode_into(source, scratch)
+            assert scratch[:count].hex() == ref
+
+    with pytest.raises(ValueError, match="too small"):
+        bech32m.decode_into("test1wejkxar0wg64ekuu", bytearray(5))
+    for string in INVALID_BECH32M:
+        with pytest.raises(bech32m.Bech32mError):
+            bech32m.decode_into(string, scratch)
+
+
+def test_encode_into():
+    scratch = bytearray(100)
+    for human, data, result in ENCODE_BECH32M_VALID:
+        raw = bytearray(bech32m.decode_data(data))
+        count = bech32m.encode_into(human, memoryview(raw), scratch)
+        assert scratch[:count].decode("ascii") == result
+
+    legacy = bech32m.Encoding.BECH32
+    for raw in (b"", b"vector", bytes(range(40))):
+        count = bech32m.encode_into("test", raw, scratch, None, legacy)
+        assert scratch[:count].decode("ascii") == bech32m.encode(
+            "test", raw, None, legacy
+        )
+
+    with pytest.raises(ValueError, match="too small"):
+        bech32m.encode_into("test", b"vector", bytearray(20))
+    for human, data in ENCODE_BECH32M_INVALID:
+        with pytest.raises(bech32m.Bech32mError):
+            bech32m.encode_into(human, data, scratch)
+
+
+def test_into_exact_buffers():
+    rng = random.Random(27)
+    for length in range(0, 60):
+        # Zero bytes leave out the padding symbol and byte
+        for raw in (rng.randbytes(length), bytes(length)):
+            string = bech32m.encode("a", raw, max_length=None)
+            out = bytearray(len(string))
+            assert bech32m.encode_into("a", raw, out, None) == len(string)
+            assert out.decode("ascii") == string
+
+            decoded = bech32m.decode(string, max_length=None)[1]
+            exact = bytearray(len(decoded))
+            assert bech32m.decode_into(string, exact, max_length=None) == len(decoded)
+            assert exact == decoded
+            if decoded:
+                with pytest.raises(ValueError, match="too small"):
+                    bech32m.decode_into(string, exact[1:], max_length=None)
+
+
+def test_decode_many():
+    strings = [string for string, _ in DECODE_BECH32M_MATCH] + INVALID_BECH32M
+    strings += [string.encode("latin-1") for string in strings]
+    for string, result in zip(strings, bech32m.decode_many(strings)):
+        try:
+            assert (result.human, result.data) == bech32m.decode(string)
+            assert result.status == bech32m.Status.OK
+        except bech32m.Bech32mError as ex:
+            assert result == (ex.status, "", b"")
+
+    buffers = [bytearray(strings[0].encode()), memoryview(strings[0].encode())]
+    assert bech32m.decode_many(buffers) == bech32m.decode_many(strings[:1]) * 2
+    for item in [300000000, 10**30, None]:
+        with pytest.raises(TypeError):
+            bech32m.decode_many([item])
+        with pytest.raises(TypeError):
+            bech32m.decode(item)
+
+
+def test_decode_many_rows():
+    rng = random.Random(31)
+    payloads = [rng.randbytes(rng.randrange(50)) for _ in range(bech32m.DECODE_ROWS)]
+    payloads += [bytes(length) for length in range(50)]
+    strings = [bech32m.encode("a", payload) for payload in payloads]
+    strings += [string.upper() for string in strings[:50]]
+    strings += [string[:5] + string[5:].upper() for string in strings[:50]]
+    for engine in bech32m.ENGINES:
+        results = bech32m.decode_many(strings, engine=engine)
+        for string, result in zip(strings, results):
+            try:
+                assert result == (bech32m.Status.OK, *bech32m.decode(string))
+            except bech32m.Bech32mError as ex:
+                assert result == (ex.status, "", b"")
+        assert results[-1].status == bech32m.Status.MIXED_CASE
+
+
+def test_encode_many():
+    rng = random.Random(12)
+    payloads = [rng.randbytes(length) for length in range(60)]
+    results = bech32m.encode_many("Test", payloads)
+    for payload, result in zip(payloads, results):
+        try:
+            assert result == (bech32m.Status.OK, bech32m.encode("Test", payload))
+        except bech32m.Bech32mError as ex:
+            assert result == (ex.status, "")
+    assert results[-1].status == bech32m.Status.TOO_LONG
+
+    legacy = bech32m.Encoding.BECH32
+    results = bech32m.encode_many("Test", payloads, None, legacy)
+    for payload, (status, string) in zip(payloads, results):
+        assert status == bech32m.Status.OK
+        assert string == bech32m.encode("Test", payload, None, legacy)
+        assert bech32m.decode_any(string, max_length=None)[0] == legacy
+
+    with pytest.raises(bech32m.Bech32mError):
+        bech32m.encode_many("", payloads)
+
+
+def test_polymod_sliced():
+    rng = random.Random(14)
+    rows = [rng.randbytes(23).translate(bytes(range(32)) * 8) for _ in range(100)]
+    state = bech32m.polymod_sliced(rows, 12345)
+    for idx, row in enumerate(rows):
+        shift = len(rows) - 1 - idx
+        value = sum((state[bit] >> shift & 1) << bit for bit in range(30))
+        assert value == bech32m.polymod(row, 12345)
+
+    rows[7] = bytes(22) + b"\x01"
+    valid = bech32m.verify_sliced(rows, 12345)
+    assert valid == [bech32m.polymod(row, 12345) == bech32m.BECH32M for row in rows]
+    assert bech32m.verify_sliced([]) == []
+
+    with pytest.raises(ValueError):
+        bech32m.polymod_sliced([b"\x00", b"\x00\x00"])
+
+
+def test_decode_many_sliced():
+    rng = random.Random(14)
+    strings = [bech32m.encode("bc", rng.randbytes(20)) for _ in range(200)]
+    strings += [string for string, _ in DECODE_BECH32M_MATCH] + INVALID_BECH32M
+    for idx in range(0, len(strings), 3):
+        pos = rng.randrange(len(strings[idx]))
+        strings[idx] = strings[idx][:pos] + "q" + strings[idx][pos + 1 :]
+
+    sliced = bech32m.decode_many(strings, engine="sliced")
+    assert sliced == bech32m.decode_many(strings)
+
+    with pytest.raises(ValueError):
+        bech32m.decode_many(strings, engine="gpu")
+
+
+def test_decode_cache():
+    now = [0.0]
+    cache = bech32m.DecodeCache(capacity=2, ttl=10, clock=lambda: now[0])
+    valid = bech32m.encode("bc", bytes(range(20)))
+    typo = valid[:10] + ("q" if valid[10] != "q" else "p") + valid[11:]
+
+    assert cache.decode(valid) == bech32m.decode(valid)
+    assert cache.decode(valid) == bech32m.decode(valid)
+    for _ in range(2):
+        with pytest.raises(bech32m.Bech32mError) as info:
+            cache.decode(typo)
+        assert info.value.suggestions == [valid]
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 2,
+        "evictions": 0,
+        "expirations": 0,
+        "size": 2,
+        "capacity": 2,
+    }
+
+    # The least recently used entry goes
+    cache.decode(valid)
+    cache.decode(valid, max_errors=0)
+    assert cache.evictions == 1
+    cache.decode(valid)
+    assert cache.hits == 4
+
+    now[0] = 11
+    cache.decode(valid)
+    assert cache.expirations == 1 and cache.misses == 4
+
+    cache.invalidate(valid)
+    assert len(cache) == 0
+    with pytest.raises(bech32m.Bech32mError):
+        cache.decode(typo, correct=False)
+    cache.invalidate()
+    assert len(cache) == 0
+
+    data = bytearray(valid.encode())
+    assert cache.decode(data) == cache.decode(memoryview(data)) == bech32m.decode(valid)
+    assert cache.hits == 5 and len(cache) == 1
+    cache.decode(valid)
+    cache.invalidate(data)
+    assert len(cache) == 1
+    cache.invalidate(valid)
+    assert len(cache) == 0
+
+
+VALID_BECH32 = [
+    "A12UEL5L",
+    "a12uel5l",
+    "an83characterlonghumanreadablepartthatcontainsthenumber1andtheexcludedcharactersbio1tt5tgs",
+    "abcdef1qpzry9x8gf2tvdw0s3jn54khce6mua7lmqqqxw",
+    "split1checkupstagehandshakeupstreamerranterredcaperred2y9e3w",
+    "?1ezyfcl",
+]
+
+
+def test_decode_any_classifies():
+    for string in VALID_BECH32:
+        encoding, human, data = bech32m.decode_any(string)
+        assert encoding == bech32m.Encoding.BECH32
+        assert bech32m.encode(human, data, encoding=encoding) == string.lower()
+        with pytest.raises(bech32m.Bech32mError):
+            bech32m.decode(string, correct=False)
+
+    for string in VALID_BECH32M:
+        encoding, human, data = bech32m.decode_any(string)
+        assert encoding == bech32m.Encoding.BECH32M
+        assert (human, data) == bech32m.decode(string)
+
+    assert bech32m.check_string(VALID_BECH32[0]).encoding == bech32m.Encoding.BECH32
+    result = bech32m.check_string(VALID_BECH32[0], encodings=[bech32m.Encoding.BECH32M])
+    assert result.status == bech32m.Status.INVALID_CHECKSUM and result.encoding is None
+
+    checksum = bech32m.Bech32mChecksum("a", bech32m.base32_to_bytes("2uel5l"))
+    assert checksum.encoding() == bech32m.Encoding.BECH32
+    assert checksum.verify(bech32m.Encoding.BECH32) and not checksum.verify()
+
+
+def test_decode_any_corrects_closer_variant():
+    for encoding in bech32m.Encoding:
+        valid = bech32m.encode("bc", bytes(range(20)), encoding=encoding)
+        typo = valid[:10] + ("q" if valid[10] != "q" else "p") + valid[11:]
+        with pytest.raises(bech32m.Bech32mError) as info:
+            bech32m.decode_any(typo)
+        assert info.value.suggestions == [valid]
@@ -0,0 +1,270 @@
+#! /bin/env python3
+"""Search for bech32m strings with chosen data and checksum characters
+
+Every candidate is `hrp1` + prefix + suffix + checksum. The checksum state
+after the human readable part and the prefix is computed once, only the
+suffix symbols are enumerated, and a candidate matches when its checksum
+ends with the requested characters.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import product
+from typing import Callable, Deque, Iterator, NamedTuple, Optional, Tuple, Union
+
+import bech32m
+from bech32m import (
+    BECH32M_CHECKSUM_LENGTH,
+    BECH32M_MAX_LENGTH,
+    Bech32mChecksum,
+    Encoding,
+    polymod,
+)
+
+# Trailing suffix symbols enumerated by one task, 32 ** 3 candidates each
+BLOCK_LEVELS = 3
+
+# Tasks per worker process in flight
+BLOCKS_PER_JOB = 4
+
+# Last suffix symbol followed by the zeros the checksum is computed over
+_TAILS = [bytes([symbol]) + bytes(BECH32M_CHECKSUM_LENGTH) for symbol in range(32)]
+
+
+class Progress(NamedTuple):
+    """Progress of a search, passed to the `progress` callback"""
+
+    candidates: int
+    total: int
+    matches: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """Candidates checked per second"""
+        return self.candidates / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _symbols(text: str, what: str) -> bytes:
+    try:
+        return bech32m.base32_to_bytes(text.lower())
+    except bech32m.Bech32mError:
+        raise ValueError(
+            f"{what} has characters outside of the bech32m charset"
+        ) from None
+
+
+def _index_symbols(index: int, count: int) -> bytes:
+    """The `count` symbols of a suffix by its index, most significant first"""
+    return bytes(index >> 5 * (count - 1 - idx) & 31 for idx in range(count))
+
+
+def _search_block(
+    state: int,
+    head: bytes,
+    levels: int,
+    mask: int,
+    target: int,
+) -> list[bytes]:
+    """Suffixes `head` + `levels` symbols whose checksum matches the target
+
+    Runs in the worker processes. The state is advanced by the head once and
+    by the middle symbols once per 32 candidates, the last symbol and the
+    checksum then take a single polymod per candidate.
+    """
+    state = polymod(head, state)
+    found = []
+    for middle in product(range(32), repeat=levels - 1):
+        middle_state = polymod(bytes(middle), state)
+        for symbol, tail in enumerate(_TAILS):
+            if polymod(tail, middle_state) & mask == target:
+                found.append(head + bytes(middle) + bytes([symbol]))
+    return found
+
+
+def _ordered_blocks(
+    tasks: Iterator[Tuple[int, bytes, int, int, int]], jobs: int
+) -> Iterator[list[bytes]]:
+    """Run `_search_block` over the tasks on `jobs` processes, in task order
+
+    Closing the generator drops the tasks not yet started.
+    """
+    if jobs == 1:
+        for task in tasks:
+            yield _search_block(*task)
+        return
+
+    pool = ProcessPoolExecutor(jobs)
+    in_flight: Deque[Future] = deque()
+    try:
+        for task in tasks:
+            in_flight.append(pool.submit(_search_block, *task))
+            if len(in_flight) >= jobs * BLOCKS_PER_JOB:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def search(
+    hrp: str,
+    prefix: str,
+    suffix_length: int,
+    ending: str = "",
+    limit: Optional[int] = 1,
+    jobs: int = 1,
+    encoding: Encoding = Encoding.BECH32M,
+    max_length: Union[int, None] = BECH32M_MAX_LENGTH,
+    progress: Optional[Callable[[Progress], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Iterator[str]:
+    """Yield strings `hrp1` + prefix + suffix + checksum whose checksum ends
+    with `ending`, in the order of the suffixes
+
+    All suffixes of `suffix_length` symbols are tried, on `jobs` worker
+    processes, until `limit` strings are found (None for no limit), `cancel`
+    is set or the generator is closed. `progress` is called after every
+    finished task of `32 ** BLOCK_LEVELS` candidates.
+    """
+    bech32m.check_human(hrp)
+    hrp = hrp.lower()
+    prefix_symbols = _symbols(prefix, "Prefix")
+    ending_symbols = _symbols(ending, "Ending")
+    if len(ending_symbols) > BECH32M_CHECKSUM_LENGTH:
+        raise ValueError(
+            f"Ending can be at most {BECH32M_CHECKSUM_LENGTH} characters long"
+        )
+    if suffix_length < 1:
+        raise ValueError("Suffix has to be at least 1 symbol long")
+    length = len(hrp) + len("1") + len(prefix_symbols) + suffix_length
+    length += BECH32M_CHECKSUM_LENGTH
+    if max_length is not None and length > max_length:
+        raise bech32m.Bech32mError(bech32m.Status.TOO_LONG, (length, max_length))
+
+    # The ending fixes the low bits of the checksum value, the constant of the
+    # encoding is xored into the target instead of into every candidate
+    mask = (1 << 5 * len(ending_symbols)) - 1
+    target = 0
+    for symbol in ending_symbols:
+        target = target << 5 | symbol
+    target ^= encoding.constant & mask
+
+    checksum = Bech32mChecksum(hrp, prefix_symbols)
+    start = hrp + "1" + prefix.lower()
+    levels = min(suffix_length, BLOCK_LEVELS)
+    heads = suffix_length - levels
+
+    def tasks() -> Iterator[Tuple[int, bytes, int, int, int]]:
+        for index in range(32**heads):
+            if cancel is not None and cancel.is_set():
+                return
+            yield checksum.state, _index_symbols(index, heads), levels, mask, target
+
+    begin = time.perf_counter()
+    candidates = 0
+    matches = 0
+    blocks = _ordered_blocks(tasks(), max(jobs, 1))
+    try:
+        for found in blocks:
+            candidates += 32**levels
+            for suffix in found[: None if limit is None else limit - matches]:
+                fork = checksum.copy()
+                fork.update(suffix)
+                matches += 1
+                yield start + bech32m.bytes_to_base32(suffix + fork.digest(encoding))
+            if progress is not None:
+                elapsed = time.perf_counter() - begin
+                progress(Progress(candidates, 32**suffix_length, matches, elapsed))
+            if limit is not None and matches >= limit:
+                return
+            if cancel is not None and cancel.is_set():
+                return
+    finally:
+        blocks.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("prefix", help="Characters the data part starts with")
+    parser.add_argument(
+        "--hrp", dest="human_part", default="bc", help="Human readable part"
+    )
+    parser.add_argument(
+        "--suffix",
+        type=int,
+        default=BLOCK_LEVELS,
+        help="Number of data characters enumerated after the prefix",
+    )
+    parser.add_argument(
+        "--ending", default="", help="Characters the checksum has to end with"
+    )
+    parser.add_argument(
+        "-n",
+        "--limit",
+        type=int,
+        default=1,
+        help="Stop after this many strings are found, 0 for all of them",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes, 0 for one per CPU",
+    )
+    parser.add_argument(
+        "--bech32",
+        action="store_true",
+        help="Use the original bech32 checksum instead of bech32m",
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="Don't report progress on stderr"
+    )
+    args = parser.parse_args()
+
+    # A progress line is kept on stderr and ended before anything else is printed
+    shown = False
+
+    def report(state: Progress) -> None:
+        nonlocal shown
+        shown = True
+        print(
+            f"\r{state.candidates}/{state.total} candidates, {state.matches} found,"
+            f" {state.rate:.0f}/s",
+            end="",
+            file=sys.stderr,
+        )
+
+    encoding = Encoding.BECH32 if args.bech32 else Encoding.BECH32M
+    try:
+        for string in search(
+            args.human_part,
+            args.prefix,
+            args.suffix,
+            args.ending,
+            args.limit or None,
+            args.jobs or os.cpu_count() or 1,
+            encoding,
+            progress=None if args.quiet else report,
+        ):
+            if shown:
+                print(file=sys.stderr)
+                shown = False
+            print(string, flush=True)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except ValueError as ex:
+        sys.exit(f"Error: {ex}")
+    finally:
+        if shown:
+            print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()